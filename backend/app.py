@@ -1,17 +1,26 @@
 # This is the main app file — it wires everything together.
-# It loads the trained model and vectorizer, connects to the database,
+# It loads the compiled inference engine (model + vectorizer), connects to the database,
 # registers the prediction and feedback routes, and runs the server.
 
+import time
+STARTED_AT = time.perf_counter()  # before the heavy imports, so startup timings include them
+
 from flask import Flask
 from flask_cors import CORS
 from werkzeug.middleware.proxy_fix import ProxyFix
-from config.db import db, DATABASE_URL
+from config.db import db, DATABASE_URL, PGBOUNCER, STATEMENT_TIMEOUT_MS, engine_options
 from models import feedback  # Ensures SQLAlchemy sees the model
+from models.feedback import upgrade_feedback_schema
 from routes.predict import predict_bp
 from routes.feedback import feedback_bp
 from routes.health import health_bp
+from ml.registry import ModelHolder
+from ml.cache import cache_from_env
+from services.db_pool import ReadinessProbe, install_statement_timeout
+from services.feedback_writer import FeedbackWriter
+from services import metrics
+from services.startup import Startup
 import os
-import pickle
 import sys
 import logging
 
@@ -22,6 +31,8 @@ app = Flask(__name__)
 # --------------------------------------------------
 app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# Pool size/overflow/recycle/pre-ping and statement timeout: DB_* env vars, see config/db.py
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(DATABASE_URL, "primary")
 app.config["JSON_AS_ASCII"] = False                 # keep PT accents intact
 app.config["MAX_CONTENT_LENGTH"] = 64 * 1024        # cap request size at 64KB
 DEBUG = os.getenv("FLASK_DEBUG", "0") == "1"
@@ -46,6 +57,7 @@ CORS(
     app,
     resources={
         r"/predict": {"origins": FRONTEND_ORIGINS},
+        r"/predict/batch": {"origins": FRONTEND_ORIGINS},
         r"/feedback": {"origins": FRONTEND_ORIGINS},
         r"/healthz": {"origins": "*"},  # safe to allow since it returns a simple OK
     },
@@ -54,6 +66,9 @@ CORS(
     supports_credentials=False,
 )
 
+# Request latency, sizes and status counters for /metrics
+metrics.init_app(app)
+
 # Behind a proxy on Render — fix scheme/host for url_for, etc.
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1)
 
@@ -78,28 +93,52 @@ app.register_blueprint(health_bp)
 # --------------------------------------------------
 # Initialize DB (create tables once if you want auto-provision)
 # Consider controlling this with an env var in production.
+# Runs as a startup step below.
 # --------------------------------------------------
 db.init_app(app)
-with app.app_context():
-    db.create_all()
+if PGBOUNCER:
+    with app.app_context():
+        for engine in db.engines.values():
+            install_statement_timeout(engine, STATEMENT_TIMEOUT_MS)
+
+# /readyz checks the DB through its own tiny pool, with the result cached briefly
+app.config["DB_PROBE"] = ReadinessProbe.from_env(DATABASE_URL)
+
+def init_database():
+    with app.app_context():
+        db.create_all()
+        upgrade_feedback_schema(db.engine)  # adds text_hash to pre-existing tables
+
+# Feedback is written in batches by a background thread (FEEDBACK_ASYNC=0 to
+# write inline per request); see services/feedback_writer.py for tuning env vars
+if os.getenv("FEEDBACK_ASYNC", "1") == "1":
+    app.config["FEEDBACK_WRITER"] = FeedbackWriter.from_env(app)
 
 # --------------------------------------------------
-# Load ML artifacts (vectorizer + model)
+# Load the compiled inference engine (numpy-only; no sklearn in workers)
+# - Published to data/registry by mlpipeline/05_export_engine.py (see ml/registry.py)
+# - Arrays are memory-mapped, so Gunicorn workers share the same pages
+# - Each worker watches registry/CURRENT and hot-swaps new versions
+#   (MODEL_POLL_SECONDS; MODEL_DIR pins one artifact dir instead)
 # - Use try/except so startup fails gracefully with a clear log
 # --------------------------------------------------
-try:
-    with open("data/tfidf_vectorizer.pkl", "rb") as f:
-        vectorizer = pickle.load(f)
-    with open("data/sentiment_model.pkl", "rb") as f:
-        model = pickle.load(f)
-except Exception as e:
-    logging.error("Failed to load ML artifacts: %s", e)
-    # Exit early — running without a model would only cause 500s later
-    raise
+model_holder = ModelHolder.from_env()
 
-# Stash artifacts in app config for routes to use
-app.config["VECTORIZER"] = vectorizer
-app.config["MODEL"] = model
+def load_model():
+    try:
+        engine = model_holder.load()
+        logging.info("Loaded model version %s from %s", engine.version, model_holder.source)
+    except Exception as e:
+        logging.error("Failed to load ML artifacts: %s", e)
+        # Inline startup exits early — running without a model would only cause 500s later
+        raise
+
+# Stash the holder in app config; routes call .get() once per request
+# (None until load_model has run)
+app.config["MODEL_HOLDER"] = model_holder
+
+# Prediction cache (PREDICTION_CACHE_SIZE=0 disables it; see ml/cache.py for env vars)
+app.config["PREDICTION_CACHE"] = cache_from_env()
 
 # --------------------------------------------------
 # Register API blueprints
@@ -107,6 +146,16 @@ app.config["MODEL"] = model
 app.register_blueprint(predict_bp)
 app.register_blueprint(feedback_bp)
 
+# --------------------------------------------------
+# Run the startup steps: inline by default, or in the background with
+# BACKGROUND_STARTUP=1 (/healthz answers at once, /readyz flips when done).
+# gunicorn.conf.py preloads the app in the master so workers share it.
+# --------------------------------------------------
+startup = Startup(STARTED_AT)
+app.config["STARTUP"] = startup
+startup.run([("database", init_database), ("model", load_model)],
+            background=Startup.background_from_env())
+
 # --------------------------------------------------
 # Local dev entrypoint (Render/Gunicorn will not call this)
 # --------------------------------------------------
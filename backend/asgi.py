@@ -0,0 +1,225 @@
+# ASGI entry point: same app, but /predict and /predict/batch go through the
+# micro-batching scheduler (ml/batching.py) instead of scoring one request at a time.
+# Validation, cleaning, caching and responses are the same as routes/predict.py;
+# every other route (/feedback, /healthz, /readyz, /metrics, CORS preflights) is
+# served by the Flask app through a WSGI adapter.
+#
+# Run (from backend/):
+#   uvicorn asgi:app --host 0.0.0.0 --port $PORT
+# Tuning: MICROBATCH_MAX_SIZE (texts per batch), MICROBATCH_MAX_WAIT_MS, MICROBATCH_WORKERS
+
+import asyncio
+import json
+import logging
+import time
+from urllib.parse import parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import FRONTEND_ORIGINS, app as flask_app
+from ml.batching import MicroBatcher
+from ml.preprocess import clean_many, clean_text
+from routes.predict import (
+    MAX_BATCH_BYTES, parse_batch_body, parse_options, predict_cleaned, shape_result,
+    validate_batch, validate_text,
+)
+from services import metrics
+from services.metrics import stage
+
+log = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = flask_app.config["MAX_CONTENT_LENGTH"]
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"referrer-policy", b"no-referrer"),
+]
+
+
+class ServiceNotReady(Exception):
+    pass
+
+
+def current_engine():
+    # No Flask app context on this path; read the holder directly
+    return flask_app.config["MODEL_HOLDER"].get()
+
+
+# ───────────────────────────────────────
+# Scoring (runs in the batcher's worker thread)
+# ───────────────────────────────────────
+def make_scorer(explain: bool):
+    def score(cleaned_texts):
+        """[(model_version, result)] for one micro-batch; the engine is read once per batch."""
+        engine = current_engine()
+        if engine is None:
+            raise ServiceNotReady()
+        metrics.MICROBATCH_SIZE.observe(len(cleaned_texts))
+        cache = flask_app.config.get("PREDICTION_CACHE")
+        results = predict_cleaned(engine, cache, cleaned_texts, "microbatch", explain=explain)
+        return [(engine.version, result) for result in results]
+    return score
+
+
+# Requests asking for explanations are batched separately, so plain ones never pay for them
+batchers = {explain: MicroBatcher.from_env(make_scorer(explain)) for explain in (False, True)}
+
+
+# ───────────────────────────────────────
+# Small ASGI helpers
+# ───────────────────────────────────────
+async def read_body(receive, limit):
+    """Request body bytes, or None once it grows past `limit`."""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        size += len(chunks[-1])
+        if size > limit:
+            return None
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def send_json(send, scope, payload, status=200, extra_headers=()):
+    body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    headers += SECURITY_HEADERS
+    origin = dict(scope["headers"]).get(b"origin", b"").decode("latin-1")
+    if origin in FRONTEND_ORIGINS:
+        headers += [(b"access-control-allow-origin", origin.encode("latin-1")), (b"vary", b"Origin")]
+    headers += list(extra_headers)
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def content_type(scope):
+    raw = dict(scope["headers"]).get(b"content-type", b"").decode("latin-1")
+    mimetype = raw.split(";", 1)[0].strip().lower()
+    is_json = mimetype == "application/json" or (mimetype.startswith("application/") and mimetype.endswith("+json"))
+    return mimetype, is_json
+
+
+def query_args(scope):
+    return dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+
+
+async def scored(cleaned_texts, proba, explain):
+    """(results, model_version) through the micro-batcher, or raise ServiceNotReady/QueueFull."""
+    pairs = await batchers[explain > 0].submit(cleaned_texts)
+    results = [shape_result(result, proba, explain) for _, result in pairs]
+    return results, (pairs[0][0] if pairs else None)
+
+
+# ───────────────────────────────────────
+# Fast-path endpoints (same contract as routes/predict.py)
+# ───────────────────────────────────────
+async def predict(scope, receive, send):
+    mimetype, is_json = content_type(scope)
+    if not is_json:
+        return await send_json(send, scope, {"error": "Expected application/json body"}, 400)
+    body = await read_body(receive, MAX_BODY_BYTES)
+    if body is None:
+        return await send_json(send, scope, {"error": "Payload too large"}, 413)
+
+    with stage("/predict", "parse"):
+        try:
+            data = json.loads(body) or {}
+        except ValueError:
+            data = {}
+    with stage("/predict", "normalize"):
+        text, error, status = validate_text(data.get("text") if isinstance(data, dict) else None)
+    if error:
+        return await send_json(send, scope, {"error": error}, status)
+    proba, explain, error = parse_options(data, query_args(scope))
+    if error:
+        return await send_json(send, scope, {"error": error}, 400)
+    if current_engine() is None:
+        return await send_json(send, scope, {"error": "Service not ready"}, 503)
+
+    with stage("/predict", "clean"):
+        cleaned = clean_text(text)
+    results, version = await scored([cleaned], proba, explain)
+    with stage("/predict", "serialize"):
+        await send_json(send, scope, {**results[0], "model_version": version})
+
+
+async def predict_batch(scope, receive, send):
+    body = await read_body(receive, MAX_BATCH_BYTES)
+    if body is None:
+        return await send_json(send, scope, {"error": "Payload too large"}, 413)
+
+    with stage("/predict/batch", "parse"):
+        mimetype, is_json = content_type(scope)
+        items, error, status = parse_batch_body(body, mimetype, is_json)
+    if error:
+        return await send_json(send, scope, {"error": error}, status)
+    proba, explain, error = parse_options(query_args(scope))
+    if error:
+        return await send_json(send, scope, {"error": error}, 400)
+    engine = current_engine()
+    if engine is None:
+        return await send_json(send, scope, {"error": "Service not ready"}, 503)
+
+    with stage("/predict/batch", "normalize"):
+        results, valid_idx, valid_texts = validate_batch(items)
+    # Reported even when every item is invalid; scored batches report the engine that scored them
+    version = engine.version
+    if valid_texts:
+        with stage("/predict/batch", "clean"):
+            cleaned = clean_many(valid_texts)
+        scored_results, version = await scored(cleaned, proba, explain)
+        for i, result in zip(valid_idx, scored_results):
+            results[i] = result
+    with stage("/predict/batch", "serialize"):
+        await send_json(send, scope, {"results": results, "model_version": version})
+
+
+FAST_ROUTES = {"/predict": predict, "/predict/batch": predict_batch}
+flask_asgi = WsgiToAsgi(flask_app)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                for batcher in batchers.values():
+                    batcher.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for batcher in batchers.values():
+                    await batcher.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    handler = FAST_ROUTES.get(scope.get("path")) if scope["type"] == "http" else None
+    if handler is None or scope["method"] != "POST":
+        # Everything else (including OPTIONS preflights) is the Flask app's job
+        return await flask_asgi(scope, receive, send)
+
+    start = time.perf_counter()
+    status = {"code": 500}
+
+    async def send_recorded(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+        await send(message)
+
+    try:
+        await handler(scope, receive, send_recorded)
+    except ServiceNotReady:
+        await send_json(send_recorded, scope, {"error": "Service not ready"}, 503)
+    except asyncio.QueueFull:
+        await send_json(send_recorded, scope, {"error": "Server busy, try again shortly"}, 503,
+                        [(b"retry-after", b"1")])
+    except Exception:
+        log.exception("Prediction failed")
+        await send_json(send_recorded, scope, {"error": "Internal error"}, 500)
+    finally:
+        path = scope["path"]
+        metrics.REQUEST_SECONDS.labels(path).observe(time.perf_counter() - start)
+        length = dict(scope["headers"]).get(b"content-length")
+        if length and length.isdigit() and int(length):
+            metrics.REQUEST_BYTES.labels(path).observe(int(length))
+        metrics.RESPONSES.labels(path, str(status["code"])).inc()
@@ -0,0 +1,314 @@
+# Offline benchmark harness for the serving and pipeline hot paths.
+# Everything runs locally against the committed artifacts and a throwaway SQLite DB,
+# so results are reproducible on a laptop without network or Postgres.
+#
+# Usage (from backend/):
+#   python bench/bench.py run --out before.json            # all benchmarks
+#   python bench/bench.py run --only predict_single clean_text
+#   python bench/bench.py compare before.json after.json   # exit 1 on regressions
+#
+# Each benchmark reports latency percentiles (ms) per call and throughput in rows/sec.
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import numpy as np  # noqa: E402
+
+# Synthetic inputs are built from these plus model vocabulary (fixed seed -> same inputs every run)
+NOISE = ["https://t.co/AbC123", "@fulano", "#cinema", "kkkk", ":)", ":(", "!!", "2024", "Não", "É", "vc", "q"]
+
+
+# ───────────────────────────────────────
+# Measurement helpers
+# ───────────────────────────────────────
+def summarize(latencies, rows_per_call=1):
+    lat = np.asarray(latencies, dtype=np.float64)
+    total = float(lat.sum())
+    return {
+        "calls": int(lat.size),
+        "rows": int(lat.size * rows_per_call),
+        "p50_ms": float(np.percentile(lat, 50) * 1e3),
+        "p95_ms": float(np.percentile(lat, 95) * 1e3),
+        "p99_ms": float(np.percentile(lat, 99) * 1e3),
+        "mean_ms": float(lat.mean() * 1e3),
+        "rows_per_sec": float(lat.size * rows_per_call / total) if total > 0 else float("inf"),
+    }
+
+
+def timed_calls(fn, inputs, warmup=20):
+    for item in inputs[:warmup]:
+        fn(item)
+    latencies = []
+    clock = time.perf_counter
+    for item in inputs:
+        start = clock()
+        fn(item)
+        latencies.append(clock() - start)
+    return latencies
+
+
+def synthetic_texts(n, vocabulary, seed=42):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        words = rng.sample(vocabulary, rng.randint(3, 20)) + rng.sample(NOISE, rng.randint(0, 3))
+        rng.shuffle(words)
+        texts.append(" ".join(words))
+    return texts
+
+
+# ───────────────────────────────────────
+# Benchmarks (each gets a shared context dict and returns a summary dict)
+# ───────────────────────────────────────
+def bench_app_import(ctx):
+    # Fresh interpreter each time: measures cold import (artifacts, DB init, routes)
+    env = dict(os.environ, DATABASE_URL="", FEEDBACK_ASYNC="0")
+    code = f"import config.db; config.db.DATABASE_URL = {ctx['database_url']!r}; import app"
+    latencies = []
+    for _ in range(ctx["import_runs"]):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+def bench_artifact_load(ctx):
+    from ml.artifacts import load_engine
+    from ml.registry import current_dir
+    model_dir = ctx["model_dir"] or current_dir(ctx["registry"])
+    return summarize(timed_calls(lambda _: load_engine(model_dir), list(range(50)), warmup=3))
+
+
+def bench_engine_throughput(ctx):
+    engine, texts = ctx["engine"], ctx["texts"]
+    batch = ctx["batch_size"]
+    chunks = [texts[i:i + batch] for i in range(0, len(texts), batch)]
+    return summarize(timed_calls(engine.predict, chunks, warmup=2), rows_per_call=batch)
+
+
+def bench_sklearn_throughput(ctx):
+    # The pickled pipeline the engine replaced, for comparison (skipped without sklearn)
+    import pickle
+    try:
+        with open(BACKEND_DIR / "data/tfidf_vectorizer.pkl", "rb") as f:
+            vectorizer = pickle.load(f)
+        with open(BACKEND_DIR / "data/sentiment_model.pkl", "rb") as f:
+            model = pickle.load(f)
+    except (ImportError, FileNotFoundError) as exc:
+        return {"skipped": str(exc)}
+    texts, batch = ctx["texts"], ctx["batch_size"]
+    chunks = [texts[i:i + batch] for i in range(0, len(texts), batch)]
+    return summarize(timed_calls(lambda c: model.predict(vectorizer.transform(c)), chunks, warmup=2),
+                     rows_per_call=batch)
+
+
+def bench_clean_text(ctx):
+    from ml.preprocess import clean_text
+    return summarize(timed_calls(clean_text, ctx["texts"]))
+
+
+def bench_predict_single(ctx):
+    client = ctx["client"]
+    payloads = [{"text": t} for t in ctx["texts"][: ctx["requests"]]]
+    return summarize(timed_calls(lambda p: client.post("/predict", json=p), payloads))
+
+
+def bench_predict_batch(ctx):
+    client, batch = ctx["client"], ctx["batch_size"]
+    texts = ctx["texts"]
+    payloads = [texts[i:i + batch] for i in range(0, len(texts) - batch + 1, batch)]
+    return summarize(timed_calls(lambda p: client.post("/predict/batch", json=p), payloads, warmup=2),
+                     rows_per_call=batch)
+
+
+def bench_feedback_sync(ctx):
+    # One request = one validated row written and committed before the response
+    app, client = ctx["app"], ctx["client"]
+    writer = app.config.pop("FEEDBACK_WRITER", None)
+    try:
+        payloads = [{"text": t, "predicted_label": 1, "correct_label": i % 2}
+                    for i, t in enumerate(ctx["texts"][: ctx["requests"]])]
+        return summarize(timed_calls(lambda p: client.post("/feedback", json=p), payloads))
+    finally:
+        if writer is not None:
+            app.config["FEEDBACK_WRITER"] = writer
+
+
+def bench_feedback_async(ctx):
+    # Request latency with the background writer, plus time until everything is on disk
+    app, client = ctx["app"], ctx["client"]
+    writer = app.config.get("FEEDBACK_WRITER")
+    if writer is None:
+        return {"skipped": "FEEDBACK_ASYNC is off"}
+    payloads = [{"text": f"{t} async", "predicted_label": 0, "correct_label": i % 2}
+                for i, t in enumerate(ctx["texts"][: ctx["requests"]])]
+    start = time.perf_counter()
+    result = summarize(timed_calls(lambda p: client.post("/feedback", json=p), payloads, warmup=0))
+    while writer.pending():
+        time.sleep(0.005)
+    writer.stop()
+    result["drain_sec"] = time.perf_counter() - start
+    result["rows_per_sec_end_to_end"] = len(payloads) / result["drain_sec"]
+    return result
+
+
+BENCHMARKS = {
+    "app_import": bench_app_import,
+    "artifact_load": bench_artifact_load,
+    "engine_throughput": bench_engine_throughput,
+    "sklearn_throughput": bench_sklearn_throughput,
+    "clean_text": bench_clean_text,
+    "predict_single": bench_predict_single,
+    "predict_batch": bench_predict_batch,
+    "feedback_sync": bench_feedback_sync,
+    "feedback_async": bench_feedback_async,
+}
+
+
+# ───────────────────────────────────────
+# Commands
+# ───────────────────────────────────────
+def build_context(args, tmp_dir):
+    # Point the app at a throwaway SQLite DB and disable the prediction cache so
+    # every request measures the real path. Must happen before importing app.
+    os.environ["DATABASE_URL"] = ""
+    os.environ["PREDICTION_CACHE_SIZE"] = "0"
+    os.environ["MODEL_POLL_SECONDS"] = "0"
+    os.environ["MODEL_REGISTRY"] = args.registry
+    if args.model_dir:
+        os.environ["MODEL_DIR"] = args.model_dir
+    os.chdir(BACKEND_DIR)
+    import config.db
+    database_url = f"sqlite:///{Path(tmp_dir) / 'bench.db'}"
+    config.db.DATABASE_URL = database_url
+
+    import app as app_module
+
+    engine = app_module.app.config["MODEL_HOLDER"].get()
+    vocabulary = engine.vocabulary()
+    raw_texts = synthetic_texts(args.rows, vocabulary)
+    return {
+        "app": app_module.app,
+        "client": app_module.app.test_client(),
+        "engine": engine,
+        "model_dir": args.model_dir,
+        "registry": args.registry,
+        "database_url": database_url,
+        "texts": raw_texts,
+        "batch_size": args.batch_size,
+        "requests": args.requests,
+        "import_runs": args.import_runs,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cmd_run(args):
+    names = args.only or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        sys.exit(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ctx = build_context(args, tmp_dir)
+        results = {}
+        for name in names:
+            print(f"running {name} ...", file=sys.stderr)
+            results[name] = BENCHMARKS[name](ctx)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "rows": args.rows,
+            "batch_size": args.batch_size,
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+        print(f"wrote {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+# Higher is better for throughput, lower is better for latency
+COMPARED_METRICS = {"p50_ms": -1, "p95_ms": -1, "p99_ms": -1, "rows_per_sec": +1}
+
+
+def cmd_compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        old = json.load(f)["results"]
+    with open(args.candidate, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+
+    regressions = 0
+    print(f"{'benchmark':<20} {'metric':<13} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for name in sorted(set(old) & set(new)):
+        for metric, direction in COMPARED_METRICS.items():
+            if metric not in old[name] or metric not in new[name]:
+                continue
+            before, after = old[name][metric], new[name][metric]
+            change = (after - before) / before if before else 0.0
+            worse = change * direction < -args.threshold
+            regressions += worse
+            flag = "  REGRESSION" if worse else ""
+            print(f"{name:<20} {metric:<13} {before:>12.3f} {after:>12.3f} {change:>+8.1%}{flag}")
+
+    if regressions:
+        print(f"\n{regressions} metric(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serving and pipeline hot paths.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run benchmarks and emit JSON")
+    run.add_argument("--only", nargs="+", metavar="NAME", help=f"subset of: {', '.join(BENCHMARKS)}")
+    run.add_argument("--out", help="write JSON here instead of stdout")
+    run.add_argument("--rows", type=int, default=20000, help="synthetic texts (default: X_test size)")
+    run.add_argument("--batch-size", type=int, default=100)
+    run.add_argument("--requests", type=int, default=2000, help="HTTP calls per endpoint benchmark")
+    run.add_argument("--import-runs", type=int, default=5)
+    run.add_argument("--registry", default="data/registry")
+    run.add_argument("--model-dir", help="benchmark a fixed artifact dir instead of registry/CURRENT")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="diff two JSON reports")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=0.10,
+                         help="relative change that counts as a regression (default 10%%)")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
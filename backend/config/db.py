@@ -4,6 +4,18 @@ from pathlib import Path
 
 db = SQLAlchemy()
 
+
+def normalize_url(raw: str) -> str:
+    # Normalize Postgres URL for SQLAlchemy + require SSL on Render
+    if raw.startswith("postgres://"):
+        raw = raw.replace("postgres://", "postgresql+psycopg2://", 1)
+    elif raw.startswith("postgresql://") and "postgresql+psycopg" not in raw:
+        raw = raw.replace("postgresql://", "postgresql+psycopg2://", 1)
+    if "sslmode=" not in raw:
+        raw += ("&" if "?" in raw else "?") + "sslmode=require"
+    return raw
+
+
 raw = (os.getenv("DATABASE_URL") or "").strip()
 
 if not raw:
@@ -16,11 +28,47 @@ if not raw:
     sqlite_path = DB_DIR / "local.db"
     DATABASE_URL = f"sqlite:///{sqlite_path}"
 else:
-    # Normalize Postgres URL for SQLAlchemy + require SSL on Render
-    if raw.startswith("postgres://"):
-        raw = raw.replace("postgres://", "postgresql+psycopg2://", 1)
-    elif raw.startswith("postgresql://") and "postgresql+psycopg" not in raw:
-        raw = raw.replace("postgresql://", "postgresql+psycopg2://", 1)
-    if "sslmode=" not in raw:
-        raw += ("&" if "?" in raw else "?") + "sslmode=require"
-    DATABASE_URL = raw
+    DATABASE_URL = normalize_url(raw)
+
+# Optional read replica for offline read-only work (mlpipeline/06_export_feedback.py);
+# the web app only ever connects to DATABASE_URL
+_read_raw = (os.getenv("DATABASE_READ_URL") or "").strip()
+DATABASE_READ_URL = normalize_url(_read_raw) if _read_raw else None
+
+# --------------------------------------------------
+# Connection pool settings (env-driven)
+# TLS handshakes to Render Postgres are expensive, so connections are kept and reused:
+#   DB_POOL_SIZE (5) + DB_MAX_OVERFLOW (5)  connections per worker process
+#   DB_POOL_TIMEOUT (10s)                   wait for a free connection before failing
+#   DB_POOL_RECYCLE (1800s)                 replace connections older than this
+#   DB_POOL_PRE_PING (1)                    test a connection on checkout, reconnect if dead
+#   DB_STATEMENT_TIMEOUT_MS (5000, 0 = off) Postgres statement_timeout
+#   DB_PGBOUNCER (0)                        behind PgBouncer in transaction mode: no startup
+#                                           'options' (PgBouncer rejects them); the timeout is
+#                                           set per transaction with SET LOCAL instead
+# --------------------------------------------------
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
+
+
+def engine_options(url: str, pool_name: str) -> dict:
+    """create_engine() keyword arguments for `url` (pool metrics are labelled `pool_name`)."""
+    from services.db_pool import InstrumentedQueuePool
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_logging_name": pool_name,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+    if url.startswith("postgresql") and STATEMENT_TIMEOUT_MS > 0 and not PGBOUNCER:
+        options["connect_args"] = {"options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"}
+    return options
@@ -0,0 +1,54 @@
+# Gunicorn settings (picked up automatically from the working directory).
+# Workers/threads/timeout still come from the command line or GUNICORN_CMD_ARGS.
+#
+# Preload (default): the master imports app.py once — DB schema check, model load,
+# warm-up — and forks workers from it, so workers start serving immediately and share
+# the loaded modules and model pages copy-on-write instead of each loading their own.
+# GUNICORN_PRELOAD=0 imports the app in every worker; combine it with
+# BACKGROUND_STARTUP=1 to have /healthz answer before the model is loaded.
+
+import gc
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Start from an empty metrics dir: files left by a previous run would be summed into
+# this one. Done here, not in on_starting: gunicorn runs this file before it loads
+# the app, while with preload the app (and its metrics, which open their files at
+# import) is already loaded by the time on_starting runs. Only once per master,
+# since a HUP re-reads this file while the master's metric files are in use.
+if PROMETHEUS_MULTIPROC_DIR and os.environ.get("_PROMETHEUS_DIR_CLEARED_BY") != str(os.getpid()):
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    os.environ["_PROMETHEUS_DIR_CLEARED_BY"] = str(os.getpid())
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+if preload_app:
+    # Everything has to be loaded before the fork; a startup thread wouldn't survive it
+    os.environ["BACKGROUND_STARTUP"] = "0"
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the GC's reach: collections in the
+    # workers would otherwise write to (and un-share) those pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        # Sockets don't survive fork: drop the master's pooled DB connections
+        # without closing them under the master (SQLAlchemy's fork recipe).
+        # Background threads (feedback writer, model watcher) start lazily per worker.
+        from app import app
+        from config.db import db
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # Stop reporting live values for a worker that is gone (counters are kept)
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,166 @@
+# On-disk model artifact: a directory of plain .npy arrays + a JSON manifest.
+# - No pickle anywhere: np.load(allow_pickle=False) only reads raw arrays
+# - Arrays are opened with mmap_mode="r", so every Gunicorn worker maps the
+#   same page-cache pages instead of holding a private unpickled copy
+# - The manifest carries a format version (for the loader) and a content-derived
+#   model version (for logging, caches and hot-swaps)
+#
+# Layout:
+#   manifest.json   format/version info, tokenizer settings, shapes, dtypes, sha256 per file
+#   terms.npy       sorted vocabulary (fixed-width unicode, or UTF-8 bytes)
+#   term_ids.npy    feature column for each sorted term
+#   idf.npy         IDF weight per feature column (float64, float32 or int8)
+#   coef.npy        classifier coefficients (n_classes or 1, n_features; float64, float32 or int8)
+#   intercept.npy   classifier intercepts
+#   classes.npy     class labels
+#   stem_keys.npy   optional: sorted tokens of the token -> stem table (ml/stemming.py)
+#   stem_values.npy optional: normalized form of each key
+#   coef_scale.npy  optional: per-row scale of int8 coefficients (ml/optimize.py)
+#   idf_scale.npy   optional: scale of int8 IDF weights
+#
+# format_version 2 is only written for artifacts that need it (byte-string terms or
+# int8 weights), so plain artifacts stay readable by builds that only know version 1.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from ml.engine import LinearTextEngine
+
+ARTIFACT_FORMAT = "sentiment-linear-tfidf"
+FORMAT_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+ARRAY_NAMES = ("terms", "term_ids", "idf", "coef", "intercept", "classes")
+OPTIONAL_ARRAY_NAMES = ("stem_keys", "stem_values", "coef_scale", "idf_scale")
+DEFAULT_VECTORIZER_PARAMS = {"ngram_range": [1, 1], "sublinear_tf": False, "fold_accents": False, "stemmer": None}
+
+
+class ArtifactError(Exception):
+    """Raised when an artifact directory is missing, incomplete or incompatible."""
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def save_engine(engine: LinearTextEngine, out_dir, extra=None) -> str:
+    """Write `engine` to `out_dir` atomically; returns the model version."""
+    out_dir = Path(out_dir)
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{out_dir.name}.", dir=out_dir.parent))
+    os.chmod(tmp_dir, 0o755)  # mkdtemp is owner-only; workers may run as another user
+
+    try:
+        files = {}
+        digest = hashlib.sha256()
+        for name in ARRAY_NAMES + OPTIONAL_ARRAY_NAMES:
+            if getattr(engine, name, None) is None:
+                continue
+            arr = np.ascontiguousarray(getattr(engine, name))
+            path = tmp_dir / f"{name}.npy"
+            np.save(path, arr, allow_pickle=False)
+            file_hash = _sha256(path)
+            digest.update(file_hash.encode())
+            files[name] = {
+                "file": path.name,
+                "dtype": arr.dtype.str,
+                "shape": list(arr.shape),
+                "sha256": file_hash,
+            }
+
+        # Tokenizer settings change predictions too; only hashed when non-default,
+        # so unigram/raw-tf models keep the versions they always had
+        if engine.vectorizer_params != DEFAULT_VECTORIZER_PARAMS:
+            digest.update(json.dumps(engine.vectorizer_params, sort_keys=True).encode())
+        version = digest.hexdigest()[:12]
+        compact = engine.terms.dtype.kind == "S" or "coef_scale" in files or "idf_scale" in files
+        manifest = {
+            "format": ARTIFACT_FORMAT,
+            "format_version": FORMAT_VERSION if compact else 1,
+            "model_version": version,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "n_features": int(engine.idf.shape[0]),
+            "vectorizer": engine.vectorizer_params,
+            "classes": [int(c) for c in engine.classes],
+            "files": files,
+        }
+        if extra:
+            manifest.update(extra)
+        with open(tmp_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap into place (rename is atomic on the same filesystem)
+        if out_dir.exists():
+            old_dir = out_dir.with_name(f".{out_dir.name}.old")
+            shutil.rmtree(old_dir, ignore_errors=True)
+            os.replace(out_dir, old_dir)
+            os.replace(tmp_dir, out_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        else:
+            os.replace(tmp_dir, out_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    engine.version = version
+    return version
+
+
+def read_manifest(artifact_dir) -> dict:
+    path = Path(artifact_dir) / MANIFEST_NAME
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise ArtifactError(f"No artifact manifest at {path}") from None
+
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ArtifactError(f"Unknown artifact format {manifest.get('format')!r}")
+    if manifest.get("format_version") not in range(1, FORMAT_VERSION + 1):
+        raise ArtifactError(
+            f"Unsupported artifact format_version {manifest.get('format_version')!r} "
+            f"(this build reads 1 to {FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def load_engine(artifact_dir, mmap: bool = True, verify: bool = False) -> LinearTextEngine:
+    """Open an artifact directory as an engine (memory-mapped by default)."""
+    artifact_dir = Path(artifact_dir)
+    manifest = read_manifest(artifact_dir)
+
+    arrays = {}
+    for name in ARRAY_NAMES + OPTIONAL_ARRAY_NAMES:
+        meta = manifest["files"].get(name)
+        if meta is None:
+            if name in OPTIONAL_ARRAY_NAMES:
+                continue
+            raise ArtifactError(f"Artifact is missing array '{name}'")
+        path = artifact_dir / meta["file"]
+        if verify and _sha256(path) != meta["sha256"]:
+            raise ArtifactError(f"Checksum mismatch for {path}")
+        arr = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+        # Plain ndarray view over the mapping: same shared pages, without the
+        # np.memmap subclass overhead on every slice in the hot path
+        arrays[name] = np.asarray(arr)
+
+    # Older artifacts have no (or a partial) "vectorizer" entry: unigrams, raw tf, no stemming
+    vectorizer = {**DEFAULT_VECTORIZER_PARAMS, **manifest.get("vectorizer", {})}
+    return LinearTextEngine(
+        version=manifest["model_version"],
+        ngram_range=tuple(vectorizer["ngram_range"]),
+        sublinear_tf=vectorizer["sublinear_tf"],
+        fold_accents=vectorizer["fold_accents"],
+        stemmer=vectorizer["stemmer"],
+        **arrays,
+    )
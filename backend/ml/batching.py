@@ -0,0 +1,117 @@
+# Micro-batching scheduler for the ASGI path (asgi.py).
+# Concurrent requests put their cleaned texts on an asyncio queue; one scheduler
+# task collects them into a batch (up to max_batch_size texts or max_wait_ms after
+# the first one arrived), scores the whole batch with one call in a worker thread
+# and resolves each request's future with its slice of the results.
+# While a batch is being scored the next one fills up, so under load batches grow
+# on their own and the per-text cost drops; with no load a request waits at most
+# max_wait_ms.
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+
+class MicroBatcher:
+    """score_fn(texts) -> results is called off the event loop, one batch at a time per worker."""
+
+    def __init__(self, score_fn: Callable[[List[str]], list], max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0, workers: int = 1, max_queue: int = 10000):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.workers = workers
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.batches = self.texts = 0
+
+    @classmethod
+    def from_env(cls, score_fn) -> "MicroBatcher":
+        return cls(
+            score_fn,
+            max_batch_size=int(os.getenv("MICROBATCH_MAX_SIZE", "64")),
+            max_wait_ms=float(os.getenv("MICROBATCH_MAX_WAIT_MS", "5")),
+            workers=int(os.getenv("MICROBATCH_WORKERS", "1")),
+        )
+
+    # ───────────────────────────────────────
+    # Lifecycle (ASGI lifespan, or lazily on first submit)
+    # ───────────────────────────────────────
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="microbatch")
+            self._task = asyncio.get_running_loop().create_task(self._schedule())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._executor.shutdown(wait=True)
+            self._task = None
+
+    # ───────────────────────────────────────
+    # Producer side (request coroutines)
+    # ───────────────────────────────────────
+    async def submit(self, texts: List[str]) -> list:
+        """Score `texts` as part of some batch; results come back in order.
+
+        Raises asyncio.QueueFull when the backlog is over max_queue requests.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((texts, future))
+        return await future
+
+    # ───────────────────────────────────────
+    # Scheduler task
+    # ───────────────────────────────────────
+    async def _schedule(self) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.workers)
+        while True:
+            # Only collect when a worker is free: whatever queues up meanwhile
+            # becomes the next (bigger) batch
+            await slots.acquire()
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                try:
+                    if timeout > 0:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    else:
+                        item = self._queue.get_nowait()
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            task = loop.create_task(self._run_batch(batch))
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _run_batch(self, batch) -> None:
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        self.batches += 1
+        self.texts += len(texts)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self._executor, self.score_fn, texts)
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        start = 0
+        for request_texts, future in batch:
+            end = start + len(request_texts)
+            if not future.done():  # the client may have gone away
+                future.set_result(results[start:end])
+            start = end
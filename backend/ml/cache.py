@@ -0,0 +1,164 @@
+# Prediction cache: repeated inputs (retweets, copy-pasted complaints, the
+# frontend's sample texts) skip vectorizing and scoring entirely.
+# - Keyed by a SHA-256 of the cleaned, NFC-normalized text, so texts that only
+#   differ in URLs, @mentions, case or punctuation share one entry
+# - Bounded LRU (max entries) with a TTL per entry
+# - Optional shared SQLite store so every Gunicorn worker benefits from the
+#   others' results (the in-process LRU stays in front of it)
+# - The model version is part of every entry's key: a hot-swap never serves a stale
+#   answer, and workers briefly on different versions during a rolling swap don't
+#   evict each other's entries; old-version entries just age out (LRU / TTL)
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def cache_key(cleaned_text: str) -> str:
+    return hashlib.sha256(cleaned_text.encode("utf-8")).hexdigest()
+
+
+class SQLiteCacheStore:
+    """Cross-process cache table in a local SQLite file (WAL mode)."""
+
+    PRUNE_EVERY = 500  # writes between expiry/size sweeps
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._local = threading.local()
+        self._writes = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread and per process (never reuse across fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # cache data; losing it is harmless
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS prediction_cache ("
+                " key TEXT NOT NULL, model_version TEXT NOT NULL,"
+                " value TEXT NOT NULL, expires_at REAL NOT NULL,"
+                " PRIMARY KEY (key, model_version))"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str, version: str) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT value FROM prediction_cache WHERE key = ? AND model_version = ? AND expires_at > ?",
+            (key, version, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, version: str, value: dict) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO prediction_cache (key, model_version, value, expires_at) VALUES (?, ?, ?, ?)",
+            (key, version, json.dumps(value), time.time() + self.ttl),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self) -> None:
+        conn = self._conn()
+        conn.execute("DELETE FROM prediction_cache WHERE expires_at <= ?", (time.time(),))
+        # Over capacity: drop the entries closest to expiring (oldest writes, which
+        # after a model swap are the previous version's)
+        conn.execute(
+            "DELETE FROM prediction_cache WHERE rowid IN ("
+            " SELECT rowid FROM prediction_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class PredictionCache:
+    """Thread-safe LRU + TTL cache of prediction results."""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0, shared=None):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.shared = shared
+        self._entries = OrderedDict()  # (version, key) -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self.shared_hits = 0
+
+    def get(self, key: str, version: str) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((version, key))
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end((version, key))
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[(version, key)]
+                self.expirations += 1
+
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key, version)
+            except sqlite3.Error:
+                value = None  # shared store is best-effort
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.shared_hits += 1
+                    self._store((version, key), value, now)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, version: str, value: dict) -> None:
+        with self._lock:
+            self._store((version, key), value, time.monotonic())
+        if self.shared is not None:
+            try:
+                self.shared.put(key, version, value)
+            except sqlite3.Error:
+                pass
+
+    def _store(self, key: tuple, value: dict, now: float) -> None:
+        # Caller holds the lock
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "shared_hits": self.shared_hits,
+                "backend": "sqlite" if self.shared is not None else "memory",
+            }
+
+
+def cache_from_env() -> Optional[PredictionCache]:
+    """Build the cache from env vars; returns None when disabled (size 0)."""
+    max_entries = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+    if max_entries <= 0:
+        return None
+    ttl = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+    shared = None
+    if os.getenv("PREDICTION_CACHE_BACKEND", "memory").lower() == "sqlite":
+        path = os.getenv("PREDICTION_CACHE_PATH", "data/prediction_cache.db")
+        shared = SQLiteCacheStore(path, int(os.getenv("PREDICTION_CACHE_SHARED_SIZE", "100000")), ttl)
+    return PredictionCache(max_entries, ttl, shared)
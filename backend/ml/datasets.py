@@ -0,0 +1,130 @@
+# Vectorized train/test splits on disk: CSR components + labels as plain .npy files.
+# Replaces the pickled scipy matrices and pandas Series the pipeline used to pass around.
+# - np.load(mmap_mode="r") opens a split without reading it: scripts start instantly and
+#   slicing rows (rows()/batches()) only touches those rows' pages, so a split larger
+#   than RAM can be streamed
+# - Labels are int8: one byte per row instead of a pickled int64 Series + index
+# - The arrays are stored uncompressed on purpose: members of a compressed .npz can't be
+#   memory-mapped, they have to be inflated into memory first
+#
+# Layout (one directory per split, e.g. data/vectorized/test/):
+#   meta.json     format info, shape, nnz, dtypes
+#   indptr.npy    row pointers (n_rows + 1)
+#   indices.npy   feature column of each stored value
+#   data.npy      TF-IDF value of each stored value
+#   labels.npy    int8 label per row
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+DATASET_FORMAT = "sentiment-csr-dataset"
+FORMAT_VERSION = 1
+DATASET_DIR = "data/vectorized"
+META_NAME = "meta.json"
+ARRAY_NAMES = ("indptr", "indices", "data", "labels")
+
+
+class DatasetError(Exception):
+    """Raised when a dataset directory is missing, incomplete or can't hold the labels."""
+
+
+def _int8_labels(y) -> np.ndarray:
+    y = np.asarray(y)
+    if y.dtype.kind not in "biu" or (y.size and (y.min() < -128 or y.max() > 127)):
+        raise DatasetError(f"Labels must be small integers to store as int8 (got dtype {y.dtype})")
+    return y.astype(np.int8)
+
+
+def save_dataset(out_dir, X, y) -> None:
+    """Write the CSR matrix `X` and labels `y` to `out_dir` atomically."""
+    X = sp.csr_matrix(X)
+    X.sort_indices()
+    labels = _int8_labels(y)
+    if labels.shape != (X.shape[0],):
+        raise DatasetError(f"{X.shape[0]} rows but {labels.shape[0]} labels")
+
+    out_dir = Path(out_dir)
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{out_dir.name}.", dir=out_dir.parent))
+    try:
+        arrays = {"indptr": X.indptr, "indices": X.indices, "data": X.data, "labels": labels}
+        for name, arr in arrays.items():
+            np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(arr), allow_pickle=False)
+        meta = {
+            "format": DATASET_FORMAT,
+            "format_version": FORMAT_VERSION,
+            "shape": [int(n) for n in X.shape],
+            "nnz": int(X.nnz),
+            "dtypes": {name: arr.dtype.str for name, arr in arrays.items()},
+        }
+        with open(tmp_dir / META_NAME, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+        if out_dir.exists():
+            shutil.rmtree(out_dir)
+        os.replace(tmp_dir, out_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+class CSRDataset:
+    """One split: labels plus row-sliceable access to the TF-IDF matrix."""
+
+    def __init__(self, indptr, indices, data, labels, shape):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.labels = labels
+        self.shape = tuple(shape)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    @property
+    def nnz(self) -> int:
+        return int(self.indptr[-1])
+
+    def matrix(self) -> sp.csr_matrix:
+        """The whole split as a CSR matrix backed by the (mapped) arrays, no copy."""
+        return sp.csr_matrix((self.data, self.indices, self.indptr), shape=self.shape, copy=False)
+
+    def rows(self, start: int, stop: int) -> Tuple[sp.csr_matrix, np.ndarray]:
+        """(X, y) for rows [start, stop); only those rows' values are read."""
+        stop = min(stop, len(self))
+        lo, hi = int(self.indptr[start]), int(self.indptr[stop])
+        indptr = np.asarray(self.indptr[start:stop + 1]) - lo
+        X = sp.csr_matrix((self.data[lo:hi], self.indices[lo:hi], indptr),
+                          shape=(stop - start, self.shape[1]), copy=False)
+        return X, np.asarray(self.labels[start:stop])
+
+    def batches(self, batch_size: int) -> Iterator[Tuple[sp.csr_matrix, np.ndarray]]:
+        for start in range(0, len(self), batch_size):
+            yield self.rows(start, start + batch_size)
+
+
+def load_dataset(directory, mmap: bool = True) -> CSRDataset:
+    """Open a split written by save_dataset (memory-mapped by default)."""
+    directory = Path(directory)
+    try:
+        with open(directory / META_NAME, encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise DatasetError(f"No dataset at {directory} — run 02_split_and_vectorize.py first") from None
+    if meta.get("format") != DATASET_FORMAT or meta.get("format_version") != FORMAT_VERSION:
+        raise DatasetError(f"Unsupported dataset format in {directory}")
+
+    arrays = {}
+    for name in ARRAY_NAMES:
+        arr = np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None, allow_pickle=False)
+        arrays[name] = np.asarray(arr)
+    if arrays["indptr"].shape[0] != meta["shape"][0] + 1 or arrays["data"].shape[0] != meta["nnz"]:
+        raise DatasetError(f"Dataset in {directory} doesn't match its meta.json")
+    return CSRDataset(shape=meta["shape"], **arrays)
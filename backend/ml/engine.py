@@ -0,0 +1,324 @@
+# Compiled inference engine: a NumPy-only replacement for the pickled
+# TfidfVectorizer + LogisticRegression pair at serve time.
+# - Tokenizes exactly like sklearn's default word analyzer (lowercase + \b\w\w+\b),
+#   including word n-grams and sublinear tf when the vectorizer used them
+# - Optional Portuguese stemming / accent folding through the token -> stem table
+#   built at training time (ml/stemming.py): a dict lookup per token, no NLTK
+# - Looks tokens up in a sorted term table (np.searchsorted, no Python dict),
+#   so the arrays can be memory-mapped and shared between worker processes;
+#   the table is unicode or, in optimized artifacts, UTF-8 bytes (ml/optimize.py)
+# - Builds a tiny CSR batch (indptr/indices/data), applies IDF + L2 norm
+# - Scores with a sparse dot against the coefficient matrix and takes the argmax;
+#   int8 coefficients are scaled back per class row (coef_scale) after the gather
+# - Probabilities (sigmoid/softmax of the scores) and top-k token explanations
+#   (coef * tfidf per nonzero) come out of the same pass, no dense rows
+# The web workers only need numpy; sklearn is used by the export step alone.
+
+import re
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from ml.stemming import TokenNormalizer
+
+# sklearn's default token_pattern for TfidfVectorizer
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+# Vectorizer settings this engine reproduces; anything else is rejected at compile time.
+# ngram_range and sublinear_tf are free (carried by the engine); min_df, max_df and
+# max_features only shape the vocabulary, which is copied as-is. tokenizer may also be
+# an ml.stemming.TokenNormalizer (with token_pattern=None).
+_SUPPORTED_VECTORIZER_PARAMS = {
+    "analyzer": "word",
+    "binary": False,
+    "lowercase": True,
+    "norm": "l2",
+    "preprocessor": None,
+    "stop_words": None,
+    "strip_accents": None,
+    "token_pattern": TOKEN_PATTERN,
+    "tokenizer": None,
+    "use_idf": True,
+}
+
+CSR = Tuple[np.ndarray, np.ndarray, np.ndarray]  # (indptr, indices, data)
+
+
+def _is_one_vs_rest(model) -> bool:
+    """True for a LogisticRegression that fits one binary model per class (liblinear / "ovr")."""
+    params = model.get_params()
+    multi_class = params.get("multi_class", "auto")
+    return multi_class == "ovr" or (multi_class in ("auto", "deprecated") and params.get("solver") == "liblinear")
+
+
+class LinearTextEngine:
+    """TF-IDF features + linear classifier, evaluated with plain NumPy."""
+
+    def __init__(self, terms, term_ids, idf, coef, intercept, classes, version=None,
+                 ngram_range=(1, 1), sublinear_tf=False, stem_keys=None, stem_values=None,
+                 fold_accents=False, stemmer=None, coef_scale=None, idf_scale=None):
+        # terms is sorted; term_ids[i] is the feature column of terms[i]
+        self.terms = terms
+        self.term_ids = term_ids
+        self.idf = idf                # (n_features,)
+        self.coef = coef              # (n_classes or 1, n_features)
+        self.intercept = intercept    # (n_classes or 1,)
+        # Quantized weights: coef * coef_scale[row] and idf * idf_scale[0] are the real values
+        self.coef_scale = coef_scale  # (n_classes or 1,) or None
+        self.idf_scale = idf_scale    # (1,) or None
+        self._byte_terms = terms.dtype.kind == "S"
+        if self._byte_terms:
+            # Queries are encoded at the table's width (searchsorted is much slower across
+            # widths), which truncates longer tokens. ml/optimize.py leaves one spare byte
+            # so a truncated token is still longer than any term and can't match one;
+            # without that byte, query one byte wider instead.
+            last_bytes = np.asarray(terms).view(np.uint8).reshape(len(terms), -1)[:, -1]
+            spare = not last_bytes.any()
+            self._query_dtype = terms.dtype if spare else np.dtype(f"S{terms.dtype.itemsize + 1}")
+        self.classes = classes
+        self.version = version
+        self.ngram_range = tuple(ngram_range)
+        self.sublinear_tf = bool(sublinear_tf)
+        # Token -> stem table as two parallel arrays (what the artifact stores) and
+        # as the dict the normalizer looks tokens up in
+        self.stem_keys = stem_keys
+        self.stem_values = stem_values
+        self.fold_accents = bool(fold_accents)
+        self.stemmer = stemmer
+        table = {}
+        if stem_keys is not None and len(stem_keys):
+            table = dict(zip(np.asarray(stem_keys).tolist(), np.asarray(stem_values).tolist()))
+        self.normalizer = TokenNormalizer(table, self.fold_accents, stemmer) if table or fold_accents else None
+        self._token_re = re.compile(TOKEN_PATTERN)
+
+        if not (len(terms) == len(term_ids) == idf.shape[0] == coef.shape[1]):
+            raise ValueError("Vocabulary, IDF and coefficient shapes do not match")
+
+        # Feature column -> position in `terms` (for explanations)
+        self._term_of_col = np.empty(len(term_ids), dtype=np.int64)
+        self._term_of_col[term_ids] = np.arange(len(term_ids))
+
+    # ───────────────────────────────────────
+    # Compile from the trained sklearn objects
+    # ───────────────────────────────────────
+    @classmethod
+    def from_sklearn(cls, vectorizer, model) -> "LinearTextEngine":
+        params = vectorizer.get_params()
+        normalizer = params["tokenizer"]
+        if isinstance(normalizer, TokenNormalizer):
+            # It tokenizes with TOKEN_PATTERN itself (sklearn ignores token_pattern then)
+            params.update(tokenizer=None, token_pattern=TOKEN_PATTERN)
+        for name, expected in _SUPPORTED_VECTORIZER_PARAMS.items():
+            if params.get(name) != expected:
+                raise ValueError(f"Unsupported vectorizer setting {name}={params.get(name)!r}")
+
+        min_n, max_n = params["ngram_range"]
+        if not 1 <= min_n <= max_n:
+            raise ValueError(f"Unsupported vectorizer setting ngram_range={params['ngram_range']!r}")
+        # Multiclass probabilities are a softmax over the scores; one-vs-rest models
+        # normalize per-class sigmoids instead, so they would disagree with sklearn
+        if len(model.classes_) > 2 and _is_one_vs_rest(model):
+            raise ValueError("Unsupported one-vs-rest multiclass model (e.g. solver='liblinear'); "
+                             "train a multinomial one (lbfgs, saga)")
+
+        terms = np.array(sorted(vectorizer.vocabulary_))
+        term_ids = np.array([vectorizer.vocabulary_[t] for t in terms], dtype=np.int32)
+        stem_kwargs = {}
+        if isinstance(normalizer, TokenNormalizer):
+            keys = sorted(normalizer.table)
+            stem_kwargs = {
+                "stem_keys": np.array(keys) if keys else None,
+                "stem_values": np.array([normalizer.table[k] for k in keys]) if keys else None,
+                "fold_accents": normalizer.fold,
+                "stemmer": normalizer.stemmer,
+            }
+        return cls(
+            terms,
+            term_ids,
+            np.asarray(vectorizer.idf_, dtype=np.float64),
+            np.asarray(model.coef_, dtype=np.float64),
+            np.asarray(model.intercept_, dtype=np.float64),
+            np.asarray(model.classes_),
+            ngram_range=(min_n, max_n),
+            sublinear_tf=params["sublinear_tf"],
+            **stem_kwargs,
+        )
+
+    def with_weights(self, coef, intercept) -> "LinearTextEngine":
+        """Same vocabulary and tokenization, different (float) classifier weights."""
+        return LinearTextEngine(
+            self.terms, self.term_ids, self.idf, coef, intercept, self.classes,
+            ngram_range=self.ngram_range, sublinear_tf=self.sublinear_tf,
+            stem_keys=self.stem_keys, stem_values=self.stem_values,
+            fold_accents=self.fold_accents, stemmer=self.stemmer, idf_scale=self.idf_scale,
+        )
+
+    @property
+    def float_coef(self) -> np.ndarray:
+        """Coefficients as float64, scaled back if they are quantized."""
+        coef = np.asarray(self.coef, dtype=np.float64)
+        return coef * self.coef_scale[:, None] if self.coef_scale is not None else coef
+
+    def vocabulary(self) -> List[str]:
+        """The sorted terms as Python strings, whatever the table's dtype."""
+        return _term_strings(self.terms.tolist(), self._byte_terms)
+
+    @property
+    def vectorizer_params(self) -> dict:
+        """Tokenization settings that aren't in the arrays (stored in the artifact manifest)."""
+        return {
+            "ngram_range": list(self.ngram_range),
+            "sublinear_tf": self.sublinear_tf,
+            "fold_accents": self.fold_accents,
+            "stemmer": self.stemmer,
+        }
+
+    # ───────────────────────────────────────
+    # Inference
+    # ───────────────────────────────────────
+    def lookup(self, tokens: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Map tokens to feature columns; returns (hit_mask, columns_of_hits)."""
+        if not tokens:
+            return np.zeros(0, dtype=bool), np.zeros(0, dtype=np.int32)
+        if self._byte_terms:
+            # UTF-8 byte order is code point order, so the table's sort order still holds
+            query = np.array([t.encode("utf-8") for t in tokens], dtype=self._query_dtype)
+        else:
+            query = np.array(tokens)
+        pos = np.searchsorted(self.terms, query)
+        pos[pos == len(self.terms)] = 0
+        hit = self.terms[pos] == query
+        return hit, self.term_ids[pos[hit]]
+
+    def transform(self, texts: Iterable[str]) -> CSR:
+        """Vectorize texts into L2-normalized TF-IDF rows (CSR components)."""
+        findall = self._token_re.findall
+        tokens: List[str] = []
+        doc_lengths: List[int] = []
+        with_ngrams = self.ngram_range != (1, 1)
+        normalize = self.normalizer.normalize if self.normalizer is not None else None
+        for text in texts:
+            found = findall(text.lower())
+            if normalize is not None:
+                found = normalize(found)
+            if with_ngrams:
+                found = self._word_ngrams(found)
+            tokens.extend(found)
+            doc_lengths.append(len(found))
+
+        n_docs = len(doc_lengths)
+        n_features = self.idf.shape[0]
+        hit, cols = self.lookup(tokens)
+        docs = np.repeat(np.arange(n_docs, dtype=np.int64), doc_lengths)[hit]
+
+        # Count (doc, column) pairs; np.unique sorts them, which yields CSR order
+        keys, counts = np.unique(docs * n_features + cols, return_counts=True)
+        row_of = keys // n_features
+        indices = (keys % n_features).astype(np.int32)
+        indptr = np.zeros(n_docs + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_of, minlength=n_docs), out=indptr[1:])
+        tf = counts.astype(np.float64)
+        if self.sublinear_tf:
+            tf = 1.0 + np.log(tf)
+        # (a quantized IDF's idf_scale is uniform, so the normalization cancels it)
+        data = tf * self.idf[indices]
+
+        # L2-normalize each row (empty rows stay empty)
+        norms = np.sqrt(_row_sums(data * data, indptr))
+        norms[norms == 0.0] = 1.0
+        data /= np.repeat(norms, np.diff(indptr))
+        return indptr, indices, data
+
+    def _word_ngrams(self, tokens: List[str]) -> List[str]:
+        """Same terms, in the same order, as sklearn's _word_ngrams."""
+        min_n, max_n = self.ngram_range
+        grams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def decision_function_csr(self, indptr, indices, data) -> np.ndarray:
+        """Linear scores for already-vectorized rows, shape (n_rows, n_coef_rows)."""
+        contrib = self._contributions(indices, data)    # (n_coef_rows, nnz)
+        scores = _row_sums(contrib, indptr)             # (n_coef_rows, n_rows)
+        return scores.T + self.intercept
+
+    def predict_csr(self, indptr, indices, data) -> np.ndarray:
+        return self.classes[_argmax(self.decision_function_csr(indptr, indices, data))]
+
+    def predict(self, texts: Iterable[str]) -> np.ndarray:
+        return self.predict_csr(*self.transform(texts))
+
+    def predict_proba_csr(self, indptr, indices, data) -> np.ndarray:
+        return _probabilities(self.decision_function_csr(indptr, indices, data))
+
+    def score_csr(self, indptr, indices, data, top_k: int = 0):
+        """Predictions, probabilities (n_rows, n_classes) and, if top_k > 0, explanations.
+
+        One pass over the nonzeros: the per-token contributions used for the
+        scores are reused for the explanations. Each explanation is a list of
+        (token, weight) for the row's top_k tokens by |weight|, where weight is
+        the token's coef * tfidf towards the predicted class.
+        """
+        contrib = self._contributions(indices, data)                 # (n_coef_rows, nnz)
+        scores = _row_sums(contrib, indptr).T + self.intercept        # (n_rows, n_coef_rows)
+        best = _argmax(scores)
+        proba = _probabilities(scores)
+        if top_k <= 0:
+            return self.classes[best], proba, None
+
+        counts = np.diff(indptr)
+        row_of = np.repeat(np.arange(len(counts)), counts)
+        if contrib.shape[0] == 1:
+            # Binary: the single coefficient row points towards classes[1]
+            weights = contrib[0] * np.where(best[row_of] == 1, 1.0, -1.0)
+        else:
+            weights = contrib[best[row_of], np.arange(len(indices))]
+
+        # Sort nonzeros by row, then by |weight| descending; rows stay in CSR order
+        order = np.lexsort((-np.abs(weights), row_of))
+        tokens = _term_strings(self.terms[self._term_of_col[indices[order]]].tolist(), self._byte_terms)
+        weights = weights[order].tolist()
+        explanations = []
+        for start, count in zip(indptr[:-1].tolist(), counts.tolist()):
+            end = start + min(count, top_k)
+            explanations.append(list(zip(tokens[start:end], weights[start:end])))
+        return self.classes[best], proba, explanations
+
+    def _contributions(self, indices, data) -> np.ndarray:
+        """coef * tfidf per nonzero, shape (n_coef_rows, nnz)."""
+        contrib = self.coef[:, indices] * data
+        if self.coef_scale is not None:
+            contrib *= self.coef_scale[:, None]
+        return contrib
+
+
+def _term_strings(terms: list, byte_terms: bool) -> List[str]:
+    return [t.decode("utf-8") for t in terms] if byte_terms else terms
+
+
+def _argmax(scores: np.ndarray) -> np.ndarray:
+    """Index of the predicted class per row."""
+    if scores.shape[1] == 1:
+        # Binary logistic regression: positive score -> classes[1]
+        return (scores[:, 0] > 0).astype(np.intp)
+    return scores.argmax(axis=1)
+
+
+def _probabilities(scores: np.ndarray) -> np.ndarray:
+    """Logistic regression probabilities: sigmoid for binary, softmax otherwise."""
+    if scores.shape[1] == 1:
+        positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+        return np.column_stack([1.0 - positive, positive])
+    shifted = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+def _row_sums(values: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+    """Sum `values` (last axis = nnz) per CSR row; empty rows sum to 0."""
+    n_rows = len(indptr) - 1
+    out = np.zeros(values.shape[:-1] + (n_rows,), dtype=np.float64)
+    nonempty = indptr[1:] > indptr[:-1]
+    if nonempty.any():
+        out[..., nonempty] = np.add.reduceat(values, indptr[:-1][nonempty], axis=-1)
+    return out
@@ -0,0 +1,91 @@
+# Serving-artifact optimization (mlpipeline/10_optimize_artifact.py):
+# - Pruning: features whose |coef| is below a threshold for every class are dropped from
+#   the vocabulary; the kept ones are renumbered in term order
+# - Quantization: coefficients and IDF weights stored as float32, or as int8 with a scale
+#   (one per coefficient row, one for the IDF), dequantized by the engine on the fly
+# - The term table is stored as UTF-8 byte strings instead of fixed-width unicode
+#   (4 bytes per character), still sorted, so lookups stay one np.searchsorted;
+#   it is one byte wider than its longest term (see LinearTextEngine.__init__)
+# Pruning also drops those terms from each row's L2 norm, so scores shift slightly;
+# project_rows() maps already-vectorized rows (X_test) into the pruned feature space
+# exactly as the optimized engine would have vectorized the same texts.
+
+from typing import Tuple
+
+import numpy as np
+
+from ml.engine import CSR, LinearTextEngine
+
+WEIGHT_DTYPES = ("float64", "float32", "int8")
+
+
+def _quantize(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric int8 per row: values ≈ q * scale[row]."""
+    values = np.atleast_2d(values)
+    scale = np.abs(values).max(axis=1) / 127.0
+    scale[scale == 0.0] = 1.0
+    q = np.clip(np.rint(values / scale[:, None]), -127, 127).astype(np.int8)
+    return q, scale
+
+
+def optimize_engine(engine: LinearTextEngine, prune_threshold: float = 0.0,
+                    weights: str = "int8") -> Tuple[LinearTextEngine, np.ndarray]:
+    """(optimized engine, source column of each of its feature columns)."""
+    if weights not in WEIGHT_DTYPES:
+        raise ValueError(f"weights must be one of {WEIGHT_DTYPES}, got {weights!r}")
+
+    coef = engine.float_coef
+    idf = np.asarray(engine.idf, dtype=np.float64)
+    if engine.idf_scale is not None:
+        idf = idf * engine.idf_scale[0]
+
+    # Keep a term if it matters for at least one class; new columns follow term order
+    keep_term = (np.abs(coef).max(axis=0) >= prune_threshold)[engine.term_ids]
+    if not keep_term.any():
+        raise ValueError(f"prune_threshold={prune_threshold} would drop every feature")
+    columns = np.asarray(engine.term_ids[keep_term], dtype=np.int64)
+    encoded = [t.encode("utf-8") for t in np.asarray(engine.vocabulary(), dtype=object)[keep_term]]
+    terms = np.array(encoded, dtype=f"S{max(map(len, encoded)) + 1}")
+    n_kept = len(columns)
+    term_ids = np.arange(n_kept, dtype=np.int16 if n_kept <= np.iinfo(np.int16).max else np.int32)
+
+    coef, idf = coef[:, columns], idf[columns]
+    scales = {}
+    if weights == "int8":
+        coef, scales["coef_scale"] = _quantize(coef)
+        idf, scales["idf_scale"] = _quantize(idf)
+        idf = idf[0]
+    else:
+        coef, idf = coef.astype(weights), idf.astype(weights)
+
+    optimized = LinearTextEngine(
+        terms, term_ids, idf, coef, np.asarray(engine.intercept, dtype=np.float64), engine.classes,
+        ngram_range=engine.ngram_range, sublinear_tf=engine.sublinear_tf,
+        stem_keys=engine.stem_keys, stem_values=engine.stem_values,
+        fold_accents=engine.fold_accents, stemmer=engine.stemmer, **scales,
+    )
+    return optimized, columns
+
+
+def project_rows(indptr, indices, data, columns: np.ndarray, source_idf: np.ndarray,
+                 target_idf: np.ndarray) -> CSR:
+    """Re-express L2-normalized TF-IDF rows of the source engine in a pruned engine's space.
+
+    Rows are tf * idf / norm, so keeping the surviving columns, swapping the IDF weight
+    and re-normalizing gives exactly the pruned engine's vectors for the same texts.
+    """
+    remap = np.full(len(source_idf), -1, dtype=np.int64)
+    remap[columns] = np.arange(len(columns))
+    indptr = np.asarray(indptr, dtype=np.int64)
+    new_cols = remap[indices]
+    kept = new_cols >= 0
+    row_of = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))[kept]
+    new_cols = new_cols[kept]
+    values = np.asarray(data, dtype=np.float64)[kept] * (target_idf[new_cols] / source_idf[indices[kept]])
+
+    new_indptr = np.zeros(len(indptr), dtype=np.int64)
+    np.cumsum(np.bincount(row_of, minlength=len(indptr) - 1), out=new_indptr[1:])
+    norms = np.sqrt(np.bincount(row_of, weights=values * values, minlength=len(indptr) - 1))
+    norms[norms == 0.0] = 1.0
+    values /= norms[row_of]
+    return new_indptr, new_cols.astype(np.int32), values
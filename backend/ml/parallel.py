@@ -0,0 +1,30 @@
+# Helpers for chunked, multi-process pipeline jobs.
+
+from collections import deque
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def ordered_map(executor, fn: Callable[[T], R], items: Iterable[T], max_in_flight: int) -> Iterator[R]:
+    """Like executor.map, but lazy and bounded.
+
+    executor.map / Pool.imap pull the whole input iterable up front, which
+    defeats chunked reading. Here at most `max_in_flight` items are submitted
+    at a time, and results come back in input order, so output is deterministic
+    and memory stays bounded by max_in_flight chunks. With executor=None the
+    work runs inline.
+    """
+    if executor is None:
+        for item in items:
+            yield fn(item)
+        return
+
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
@@ -0,0 +1,58 @@
+# Text cleaning shared by the training pipeline and the API, so the model
+# sees the same kind of input when serving as it did when it was trained.
+# - One precompiled regex removes URLs, @mentions, '#' and non-letter characters
+# - Stopwords are an embedded frozenset (NLTK's Portuguese list), so neither the
+#   pipeline nor the web workers need NLTK or a corpus download
+# - clean_many() cleans a whole pandas Series (or list) without a per-row .apply
+
+import re
+
+# NLTK 3.9 stopwords.words('portuguese'), frozen here to avoid the NLTK dependency
+STOPWORDS = frozenset("""
+a à ao aos aquela aquelas aquele aqueles aquilo as às até com como da das de dela delas
+dele deles depois do dos e é ela elas ele eles em entre era eram éramos essa essas esse
+esses esta está estamos estão estar estas estava estavam estávamos este esteja estejam
+estejamos estes esteve estive estivemos estiver estivera estiveram estivéramos estiverem
+estivermos estivesse estivessem estivéssemos estou eu foi fomos for fora foram fôramos
+forem formos fosse fossem fôssemos fui há haja hajam hajamos hão havemos haver hei houve
+houvemos houver houvera houverá houveram houvéramos houverão houverei houverem houveremos
+houveria houveriam houveríamos houvermos houvesse houvessem houvéssemos isso isto já lhe
+lhes mais mas me mesmo meu meus minha minhas muito na não nas nem no nos nós nossa nossas
+nosso nossos num numa o os ou para pela pelas pelo pelos por qual quando que quem são se
+seja sejam sejamos sem ser será serão serei seremos seria seriam seríamos seu seus só
+somos sou sua suas também te tem tém temos tenha tenham tenhamos tenho terá terão terei
+teremos teria teriam teríamos teu teus teve tinha tinham tínhamos tive tivemos tiver
+tivera tiveram tivéramos tiverem tivermos tivesse tivessem tivéssemos tu tua tuas um uma
+você vocês vos
+""".split())
+
+# Single pass over lowercased text. Alternatives, tried left to right at each position:
+#   URLs (http..., www...) | @mentions (stopping where a URL starts, as if URLs had
+#   been removed first) | runs of anything but letters (incl. accented), whitespace
+#   and the emoticon characters : ( ) | a lone '@'
+_NOISE_RE = re.compile(r"http\S+|www\S+|@(?:(?!http\S|www\S)\w)+|[^a-zA-ZÀ-ÿ\s:)(@]+|@")
+
+
+def _drop_stopwords(text: str) -> str:
+    return " ".join([word for word in text.split() if word not in STOPWORDS])
+
+
+def clean_text(text: str) -> str:
+    """Lowercase, strip URLs/mentions/hashtags/non-letters and drop stopwords."""
+    return _drop_stopwords(_NOISE_RE.sub("", text.lower()))
+
+
+def clean_many(texts):
+    """Clean many texts at once.
+
+    A pandas Series goes through .str.lower/.str.replace and keeps its index
+    (missing values become ""); any other iterable returns a list.
+    """
+    if hasattr(texts, "str"):
+        stripped = texts.fillna("").astype(str).str.lower().str.replace(_NOISE_RE, "", regex=True)
+        return type(texts)(
+            [_drop_stopwords(text) for text in stripped.tolist()],
+            index=texts.index,
+            name=texts.name,
+        )
+    return [clean_text(text) for text in texts]
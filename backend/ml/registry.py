@@ -0,0 +1,231 @@
+# Model registry: versioned engine artifacts plus a "current" pointer, and the
+# holder that lets running workers switch models without a restart.
+#
+# Layout:
+#   data/registry/<model_version>/   one artifact dir per version (see ml/artifacts.py)
+#   data/registry/CURRENT            text file naming the version to serve
+#
+# Publishing writes the new version dir first and only then replaces CURRENT
+# (atomic rename), so readers never see a half-written model. Each worker's
+# ModelHolder polls CURRENT, loads + warms the new version off the request path
+# and swaps one reference. Requests grab the engine once at the start, so
+# in-flight requests finish on the model they started with.
+#
+# CLI (from backend/):
+#   python -m ml.registry list
+#   python -m ml.registry activate <version>     # roll forward/back
+
+import argparse
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional
+
+from ml.artifacts import ArtifactError, load_engine, read_manifest, save_engine
+from ml.engine import LinearTextEngine
+
+log = logging.getLogger(__name__)
+
+REGISTRY_DIR = "data/registry"
+CURRENT_NAME = "CURRENT"
+
+# Short, realistic inputs: compile regexes and fault in the mapped pages before traffic
+WARMUP_TEXTS = ["adorei o atendimento", "pior produto que ja comprei", "ok", ""]
+
+
+# ───────────────────────────────────────
+# Registry operations (used by the pipeline scripts and the CLI)
+# ───────────────────────────────────────
+def current_version(registry_dir) -> Optional[str]:
+    try:
+        return (Path(registry_dir) / CURRENT_NAME).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def version_dir(registry_dir, version: str) -> Path:
+    return Path(registry_dir) / version
+
+
+def current_dir(registry_dir) -> Path:
+    version = current_version(registry_dir)
+    if version is None:
+        raise ArtifactError(f"No {CURRENT_NAME} pointer in {registry_dir}")
+    return version_dir(registry_dir, version)
+
+
+def activate(registry_dir, version: str) -> None:
+    """Point CURRENT at an existing version (atomic replace)."""
+    read_manifest(version_dir(registry_dir, version))  # refuse to point at junk
+    pointer = Path(registry_dir) / CURRENT_NAME
+    tmp = pointer.with_name(f".{CURRENT_NAME}.tmp")
+    tmp.write_text(version + "\n", encoding="utf-8")
+    os.replace(tmp, pointer)
+
+
+def publish(engine: LinearTextEngine, registry_dir=REGISTRY_DIR, extra=None,
+            make_current: bool = True, keep: int = 5) -> str:
+    """Save `engine` as a new version (optionally making it current); returns the version."""
+    registry_dir = Path(registry_dir)
+    staging = registry_dir / ".incoming"
+    version = save_engine(engine, staging, extra=extra)
+    target = version_dir(registry_dir, version)
+    if target.exists():
+        # Same content was published before (version is a content hash)
+        shutil.rmtree(staging, ignore_errors=True)
+    else:
+        os.replace(staging, target)
+    if make_current:
+        activate(registry_dir, version)
+    prune(registry_dir, keep)
+    return version
+
+
+def list_versions(registry_dir):
+    """[(version, manifest)] oldest first; dirs without a valid manifest are skipped."""
+    versions = []
+    for path in Path(registry_dir).iterdir() if Path(registry_dir).is_dir() else []:
+        if path.is_dir() and not path.name.startswith("."):
+            try:
+                versions.append((path.name, read_manifest(path)))
+            except ArtifactError:
+                continue
+    return sorted(versions, key=lambda v: v[1].get("created_at", ""))
+
+
+def prune(registry_dir, keep: int) -> None:
+    """Delete all but the newest `keep` versions (never the current one).
+
+    Workers still serving a deleted version are unaffected: their mapped
+    files stay readable until the mapping is dropped.
+    """
+    current = current_version(registry_dir)
+    old = [v for v, _ in list_versions(registry_dir)][:-keep] if keep > 0 else []
+    for version in old:
+        if version != current:
+            shutil.rmtree(version_dir(registry_dir, version), ignore_errors=True)
+
+
+def warm_up(engine: LinearTextEngine) -> None:
+    engine.predict(WARMUP_TEXTS)
+    # Touch the big arrays so the first real request doesn't page them in
+    for arr in (engine.idf, engine.coef, engine.term_ids):
+        arr.sum()
+    engine.lookup(engine.vocabulary()[:: max(1, len(engine.terms) // 512)])
+
+
+# ───────────────────────────────────────
+# Serving side
+# ───────────────────────────────────────
+class ModelHolder:
+    """The engine a worker is serving right now, swapped when CURRENT changes.
+
+    With a fixed artifact dir (registry_dir=None) nothing is watched.
+    The watcher thread starts lazily in the process that uses it, so it is
+    fork-safe like services/feedback_writer.py.
+    """
+
+    def __init__(self, registry_dir=None, artifact_dir=None, poll_seconds: float = 5.0):
+        self.registry_dir = registry_dir
+        self.artifact_dir = artifact_dir
+        self.poll_seconds = poll_seconds
+        self._engine: Optional[LinearTextEngine] = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+        self.swaps = self.failed_swaps = 0
+        self._failed_version = None
+
+    @classmethod
+    def from_env(cls) -> "ModelHolder":
+        # MODEL_DIR pins one artifact dir (no hot-swap); otherwise serve the registry
+        model_dir = os.getenv("MODEL_DIR")
+        if model_dir:
+            return cls(artifact_dir=model_dir)
+        return cls(
+            registry_dir=os.getenv("MODEL_REGISTRY", REGISTRY_DIR),
+            poll_seconds=float(os.getenv("MODEL_POLL_SECONDS", "5")),
+        )
+
+    @property
+    def source(self) -> str:
+        return str(self.artifact_dir or self.registry_dir)
+
+    def load(self) -> LinearTextEngine:
+        """Load the current model synchronously (startup)."""
+        path = self.artifact_dir or current_dir(self.registry_dir)
+        engine = load_engine(path)
+        warm_up(engine)
+        self._engine = engine
+        return engine
+
+    def get(self) -> Optional[LinearTextEngine]:
+        """The engine to use for one request; read it once and keep using it."""
+        if self.registry_dir is not None and self.poll_seconds > 0 and self._pid != os.getpid():
+            self._ensure_started()
+        return self._engine
+
+    # ───────────────────────────────────────
+    # Watcher thread
+    # ───────────────────────────────────────
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._pid != os.getpid():
+                # Threads don't survive fork: start one in each worker
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def _watch(self) -> None:
+        while not self._stopping.wait(self.poll_seconds):
+            self.check_for_update()
+
+    def check_for_update(self) -> bool:
+        """Swap in the CURRENT version if it differs from the one being served."""
+        version = current_version(self.registry_dir)
+        serving = self._engine.version if self._engine is not None else None
+        if version is None or version in (serving, self._failed_version):
+            return False
+        try:
+            engine = load_engine(version_dir(self.registry_dir, version), verify=True)
+            warm_up(engine)
+        except Exception:
+            # Keep serving the old model; not retried until CURRENT changes again
+            self.failed_swaps += 1
+            self._failed_version = version
+            log.exception("Could not load model version %s; still serving %s", version, serving)
+            return False
+        self._engine = engine  # single reference assignment: readers see old or new, never half
+        self.swaps += 1
+        log.info("Swapped model %s -> %s", serving, version)
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or switch the served model version.")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="show versions, newest last")
+    act = sub.add_parser("activate", help="make a version current (workers pick it up)")
+    act.add_argument("version")
+    args = parser.parse_args()
+
+    if args.command == "activate":
+        activate(args.registry, args.version)
+        print(f"CURRENT -> {args.version}")
+        return
+    current = current_version(args.registry)
+    for version, manifest in list_versions(args.registry):
+        marker = "*" if version == current else " "
+        print(f"{marker} {version}  {manifest.get('created_at', '?')}  parent={manifest.get('parent_version', '-')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Optional token normalization between tokenizing and the vocabulary lookup:
+# Portuguese stemming and/or accent folding, so "adorei/adoro/adorando" share one
+# TF-IDF feature instead of taking three slots of the max_features budget.
+# - Stemming (NLTK's Snowball or RSLP stemmer) is slow and needs NLTK, so it only runs
+#   at training time: build_stem_table() stems every distinct token of the training
+#   texts once, and the token -> stem table ships inside the model artifact
+# - Serving is one dict lookup per token; a token missing from the table (never seen
+#   in training) is only accent-folded
+# - TokenNormalizer is both the TfidfVectorizer tokenizer during training and the
+#   engine's normalizer at serve time, so the two can't drift apart
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+STEMMERS = ("snowball", "rslp")
+
+# sklearn's default token_pattern (same as ml/engine.py's TOKEN_PATTERN)
+_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+
+def fold_accents(token: str) -> str:
+    """'ação' -> 'acao': decompose and drop the combining marks."""
+    if token.isascii():
+        return token
+    return "".join(c for c in unicodedata.normalize("NFD", token) if not unicodedata.combining(c))
+
+
+def _load_stemmer(name: str):
+    try:
+        from nltk.stem import RSLPStemmer, SnowballStemmer
+    except ImportError:
+        raise RuntimeError("Stemming needs NLTK at training time: pip install nltk") from None
+    if name == "snowball":
+        return SnowballStemmer("portuguese").stem
+    if name == "rslp":
+        try:
+            return RSLPStemmer().stem
+        except LookupError:
+            raise RuntimeError("RSLP needs its rules file: python -m nltk.downloader rslp") from None
+    raise ValueError(f"Unknown stemmer {name!r} (expected one of {STEMMERS})")
+
+
+def build_stem_table(texts: Iterable[str], stemmer: str = "snowball", fold: bool = False) -> Dict[str, str]:
+    """token -> normalized form for every distinct token in `texts`.
+
+    Tokens are lowercased like the vectorizer sees them. Only entries that differ
+    from the fallback (the folded or unchanged token) are kept.
+    """
+    tokens = set()
+    for text in texts:
+        tokens.update(_TOKEN_RE.findall(text.lower()))
+
+    stem = _load_stemmer(stemmer)
+    table = {}
+    for token in tokens:
+        normalized = stem(token) or token
+        if fold:
+            normalized = fold_accents(normalized)
+        if normalized != (fold_accents(token) if fold else token):
+            table[token] = normalized
+    return table
+
+
+class TokenNormalizer:
+    """Tokenizer for TfidfVectorizer: default token pattern + table lookup / accent folding."""
+
+    def __init__(self, table: Optional[Dict[str, str]] = None, fold: bool = False,
+                 stemmer: Optional[str] = None):
+        self.table = table or {}
+        self.fold = fold
+        self.stemmer = stemmer  # name only, recorded in the artifact manifest
+
+    def normalize(self, tokens: List[str]) -> List[str]:
+        get = self.table.get
+        if self.fold:
+            return [get(token) or fold_accents(token) for token in tokens]
+        return [get(token) or token for token in tokens]
+
+    def __call__(self, text: str) -> List[str]:
+        return self.normalize(_TOKEN_RE.findall(text))
+
+
+def build_vectorizer(params: dict, train_texts):
+    """TfidfVectorizer from `params`, plus the optional "stemmer"/"fold_accents" keys.
+
+    The stem table is built from `train_texts` (the texts the vectorizer is fit on).
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    params = dict(params)
+    stemmer = params.pop("stemmer", None)
+    fold = params.pop("fold_accents", False)
+    if "ngram_range" in params:
+        params["ngram_range"] = tuple(params["ngram_range"])
+    if stemmer or fold:
+        table = build_stem_table(train_texts, stemmer, fold) if stemmer else {}
+        params.update(tokenizer=TokenNormalizer(table, fold, stemmer), token_pattern=None)
+    return TfidfVectorizer(**params)
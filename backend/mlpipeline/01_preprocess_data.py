@@ -2,60 +2,190 @@
 # It loads the raw tweets, removes the noise (like links, @mentions, hashtags, stopwords, etc),
 # and saves a cleaned version I can actually use to train the model later.
 # It doesn’t train anything — just cleans. I only run it when I update or replace the original dataset.
+#
+# For big raw dumps use streaming mode: it reads the CSV in chunks, cleans them across a
+# process pool and appends each cleaned chunk to the output in input order, so memory stays
+# bounded and the output is identical to a single-process run.
+#   python mlpipeline/01_preprocess_data.py --input data/big_dump.csv \
+#       --chunksize 200000 --workers 8 --output data/cleaned_dataset.parquet
 
 # ───────────────────────────────────────
 # Imports
 # ───────────────────────────────────────
+import argparse
+import glob
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
 import pandas as pd
-import re
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+
+# Make backend/ importable so training and the API share one cleaning function
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ml.parallel import ordered_map  # noqa: E402
+from ml.preprocess import clean_many  # noqa: E402
 
 # ───────────────────────────────────────
-# Download NLTK Resources
+# Text Cleaning
 # ───────────────────────────────────────
-nltk.download('punkt')  # Downloads tokenizer model to split text into words
-nltk.download('stopwords')  # Downloads lists of stopwords for supported languages
+# clean_text / clean_many live in ml/preprocess.py (the API applies the same cleaning
+# before predicting). They lowercase, strip URLs, @mentions, '#' and non-letters in one
+# regex pass, and drop Portuguese stopwords from a built-in list — no NLTK download needed.
 
 # ───────────────────────────────────────
-# Text Cleaning Function
+# Main Program Logic
 # ───────────────────────────────────────
 
-# Load Portuguese stopwords into a Python set (faster for lookup)
-stop_words = set(stopwords.words('portuguese'))
-
-def clean_text(text):
-    # Lowercase all characters (standard NLP practice)
-    text = text.lower()
-
-    # Remove URLs (e.g., http://... or www....)
-    text = re.sub(r"http\S+|www\S+|https\S+", '', text)
+def expand_inputs(patterns):
+    return sorted(p for pattern in patterns for p in (glob.glob(pattern) or [pattern]))
 
-    # Remove @mentions and hashtags (#hashtag or @user)
-    text = re.sub(r'\@\w+|\#', '', text)
 
-    # Remove everything except letters (including accented letters),
-    # whitespace, and common emoticon characters like :) and :(
-    text = re.sub(r'[^a-zA-ZÀ-ÿ\s:\)\(]', '', text)
+def read_inputs(patterns):
+    # Accepts CSV or Parquet files/globs, e.g. the raw dataset plus the feedback
+    # chunks written by 06_export_feedback.py (same tweet_text/revised_sentiment columns)
+    paths = expand_inputs(patterns)
+    frames = [pd.read_parquet(p) if p.endswith(".parquet") else pd.read_csv(p) for p in paths]
+    print(f"Loaded {len(paths)} file(s): {', '.join(paths)}")
+    return pd.concat(frames, ignore_index=True)
 
-    # Tokenize the cleaned text into words (using Portuguese rules)
-    tokens = text.split()
 
-    # Remove stopwords (e.g., de, é, em, para...)
-    filtered_tokens = [word for word in tokens if word not in stop_words]
+def save_output(df, path):
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
 
-    # Re-join words into a cleaned string
-    return ' '.join(filtered_tokens)
 
 # ───────────────────────────────────────
-# Main Program Logic
+# Streaming Mode (chunked + multi-process)
 # ───────────────────────────────────────
 
-def main():
+def iter_chunks(paths, chunksize):
+    for path in paths:
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def clean_column(texts):
+    # Runs in a worker process; only the text column crosses the process boundary
+    return clean_many(texts).to_numpy()
+
+
+class ChunkWriter:
+    """Appends cleaned chunks to one CSV or Parquet file (written to .tmp, renamed by commit())."""
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.parquet = path.endswith(".parquet")
+        self._writer = None
+        self._schema = None
+        self._wrote_header = False
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                self._schema = pa.Schema.from_pandas(df, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.tmp_path, self._schema)
+            # Cast to the first chunk's schema so column types can't drift between chunks
+            self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+        else:
+            df.to_csv(self.tmp_path, mode="a" if self._wrote_header else "w",
+                      header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def commit(self):
+        """All chunks written: move the file into place."""
+        self._close()
+        if os.path.exists(self.tmp_path):
+            os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Failed or interrupted run: drop the partial file, leave any previous output alone."""
+        try:
+            self._close()
+        finally:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+
+def run_streaming(args):
+    paths = expand_inputs(args.input)
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Streaming {len(paths)} file(s) in chunks of {args.chunksize} rows with {workers} worker(s)")
+
+    writer = ChunkWriter(args.output)
+    distribution = None
+    rows = 0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    # Chunks stay in this process; workers only get (and return) the text column.
+    # ordered_map yields results in input order, so they pair up with this FIFO.
+    in_flight = deque()
+
+    def text_columns():
+        for chunk in iter_chunks(paths, args.chunksize):
+            in_flight.append(chunk)
+            yield chunk["tweet_text"]
+
+    try:
+        # At most 2 chunks per worker are in memory at any time
+        for cleaned_text in ordered_map(pool, clean_column, text_columns(), max_in_flight=2 * workers):
+            chunk = in_flight.popleft()
+            chunk["cleaned_text"] = cleaned_text
+            writer.write(chunk)
+
+            counts = chunk["revised_sentiment"].value_counts()
+            distribution = counts if distribution is None else distribution.add(counts, fill_value=0)
+            if rows == 0:
+                print("\nSample cleaned tweets:")
+                print(chunk[["tweet_text", "cleaned_text"]].head())
+            rows += len(chunk)
+            print(f"  cleaned {rows} rows", end="\r", flush=True)
+    except BaseException:  # incl. KeyboardInterrupt: never install a truncated output
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        writer.abort()
+        raise
+    if pool is not None:
+        pool.shutdown()
+    writer.commit()
+
+    print("\n\nSentiment distribution:")
+    print(distribution.astype(int) if distribution is not None else "(no rows)")
+    print(f"\nCleaned dataset saved to {args.output}")
 
-    # Load CSV dataset into a DataFrame
-    df = pd.read_csv("data/sentiment_dataset.csv")
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean the raw tweets for training.")
+    parser.add_argument("--input", nargs="+", default=["data/sentiment_dataset.csv"],
+                        help="CSV/Parquet files or globs (default: data/sentiment_dataset.csv)")
+    parser.add_argument("--output", default="data/cleaned_dataset.csv",
+                        help="CSV, or Parquet if it ends in .parquet")
+    parser.add_argument("--chunksize", type=int, default=0,
+                        help="rows per chunk; enables streaming mode (bounded memory)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="processes for streaming mode (default: all cores)")
+    args = parser.parse_args()
+
+    if args.chunksize > 0:
+        run_streaming(args)
+        return
+
+    # Load the dataset(s) into a DataFrame
+    df = read_inputs(args.input)
 
     # Display a preview of the data
     print("First 5 rows:")
@@ -69,17 +199,17 @@ def main():
     print("\nSentiment distribution:")
     print(df['revised_sentiment'].value_counts())
 
-    # Apply your text cleaning function to each tweet
+    # Clean every tweet in one batch call (same cleaning the API uses)
     print("\nCleaning tweets...")
-    df['cleaned_text'] = df['tweet_text'].apply(clean_text)
+    df['cleaned_text'] = clean_many(df['tweet_text'])
 
     # Show before/after for the first few tweets
     print("\nSample cleaned tweets:")
     print(df[['tweet_text', 'cleaned_text']].head())
 
     # Save cleaned data for use in model training
-    df.to_csv("data/cleaned_dataset.csv", index=False)
-    print("\nCleaned dataset saved to data/cleaned_dataset.csv")
+    save_output(df, args.output)
+    print(f"\nCleaned dataset saved to {args.output}")
 
 # ───────────────────────────────────────
 # Only run main() if this file is executed directly
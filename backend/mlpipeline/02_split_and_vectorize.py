@@ -1,12 +1,40 @@
 # This script takes my cleaned tweets and turns them into numbers using TF-IDF.
-# It splits the data into train/test, vectorizes both, and saves everything as .pkl files.
+# It splits the data into train/test, vectorizes both, and saves each split as plain .npy
+# arrays (CSR matrix + int8 labels, see ml/datasets.py) that the next steps memory-map.
 # These are the files my model will train on next — this step just preps them.
 # I only run this if I change the dataset or want to tweak how TF-IDF works.
+# --params data/tuning/best_params.json uses the vectorizer settings 08_tune_hyperparams.py picked.
+# --stemmer snowball (or rslp) and --fold-accents merge inflected/accented forms into one
+# feature; the token -> stem table is built here and travels with the vectorizer.
+
+import argparse
+import json
+import pickle
+import sys
+from pathlib import Path
 
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-import pickle
+
+# Make backend/ importable for the dataset format shared with the other steps
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ml.datasets import DATASET_DIR, save_dataset  # noqa: E402
+from ml.stemming import STEMMERS, build_vectorizer  # noqa: E402
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--params", help="best_params.json from 08_tune_hyperparams.py")
+parser.add_argument("--stemmer", choices=STEMMERS, help="Portuguese stemming (needs NLTK)")
+parser.add_argument("--fold-accents", action="store_true", help="'ação' and 'acao' become one token")
+args = parser.parse_args()
+
+vectorizer_params = {"max_features": 5000}
+if args.params:
+    with open(args.params, encoding="utf-8") as f:
+        vectorizer_params = json.load(f)["vectorizer"]
+if args.stemmer:
+    vectorizer_params["stemmer"] = args.stemmer
+if args.fold_accents:
+    vectorizer_params["fold_accents"] = True
 
 # ───────────────────────────────────────
 # 1. Load Cleaned Dataset
@@ -30,8 +58,8 @@ X_train, X_test, y_train, y_test = train_test_split(
 # ───────────────────────────────────────
 # 3. Vectorize Text with TF-IDF
 # ───────────────────────────────────────
-# Converts text into numerical features
-vectorizer = TfidfVectorizer(max_features=5000)
+# Converts text into numerical features (the stem table, if any, comes from training texts only)
+vectorizer = build_vectorizer(vectorizer_params, X_train)
 
 # Fit on training data only (important!)
 X_train_vectors = vectorizer.fit_transform(X_train)
@@ -44,17 +72,8 @@ X_test_vectors = vectorizer.transform(X_test)
 # ───────────────────────────────────────
 # We'll use these files in the model training step
 
-with open("data/X_train.pkl", "wb") as f:
-    pickle.dump(X_train_vectors, f)
-
-with open("data/X_test.pkl", "wb") as f:
-    pickle.dump(X_test_vectors, f)
-
-with open("data/y_train.pkl", "wb") as f:
-    pickle.dump(y_train, f)
-
-with open("data/y_test.pkl", "wb") as f:
-    pickle.dump(y_test, f)
+save_dataset(f"{DATASET_DIR}/train", X_train_vectors, y_train)
+save_dataset(f"{DATASET_DIR}/test", X_test_vectors, y_test)
 
 with open("data/tfidf_vectorizer.pkl", "wb") as f:
     pickle.dump(vectorizer, f)
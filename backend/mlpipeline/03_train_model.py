@@ -2,36 +2,49 @@
 # I’m loading the already vectorized text + labels, training a logistic regression model,
 # checking how well it performs, and saving it to a .pkl file for later use (like in the app).
 # Only need to run this if I change the dataset or want to retrain with different settings.
+# --params data/tuning/best_params.json uses the classifier settings 08_tune_hyperparams.py picked
+# (run 02 with the same file so the vectorizer matches).
 
+import argparse
+import json
 import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, classification_report
 
-# ───────────────────────────────────────
-# Load the vectorized data
-# ───────────────────────────────────────
-with open("data/X_train.pkl", "rb") as f:
-    X_train = pickle.load(f)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ml.datasets import DATASET_DIR, load_dataset  # noqa: E402
 
-with open("data/X_test.pkl", "rb") as f:
-    X_test = pickle.load(f)
+parser = argparse.ArgumentParser()
+parser.add_argument("--params", help="best_params.json from 08_tune_hyperparams.py")
+args = parser.parse_args()
 
-with open("data/y_train.pkl", "rb") as f:
-    y_train = pickle.load(f)
+classifier_params = {}
+if args.params:
+    with open(args.params, encoding="utf-8") as f:
+        classifier_params = json.load(f)["classifier"]
 
-with open("data/y_test.pkl", "rb") as f:
-    y_test = pickle.load(f)
+# ───────────────────────────────────────
+# Load the vectorized data (memory-mapped, nothing is read until it's used)
+# ───────────────────────────────────────
+train = load_dataset(f"{DATASET_DIR}/train")
+test = load_dataset(f"{DATASET_DIR}/test")
 
 #───────────────────────────────────────
 # Train the model
 # ───────────────────────────────────────
-model = LogisticRegression(max_iter=1000)
-model.fit(X_train, y_train)
+model = LogisticRegression(max_iter=1000, **classifier_params)
+model.fit(train.matrix(), train.labels)
 
 # ───────────────────────────────────────
 # Evaluate the model
 # ───────────────────────────────────────
-y_pred = model.predict(X_test)
+# Streamed in slices, so the test set never has to fit in memory at once
+y_test = test.labels
+y_pred = np.concatenate([model.predict(X) for X, _ in test.batches(10000)])
 
 print("\nAccuracy:", accuracy_score(y_test, y_pred))
 print("\nClassification Report:")
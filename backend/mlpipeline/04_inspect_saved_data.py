@@ -4,6 +4,14 @@
 # Not used in the actual app — just for my own brain clarity.
 
 import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ml.datasets import DATASET_DIR, load_dataset  # noqa: E402
+
 
 def inspect_pickle(path, name):
     with open(path, "rb") as f:
@@ -20,12 +28,25 @@ def inspect_pickle(path, name):
     return obj
 
 
-# Load all files
-X_train = inspect_pickle("data/X_train.pkl", "X_train (vectorized)")
-X_test = inspect_pickle("data/X_test.pkl", "X_test (vectorized)")
-y_train = inspect_pickle("data/y_train.pkl", "y_train (labels)")
-y_test = inspect_pickle("data/y_test.pkl", "y_test (labels)")
+def inspect_dataset(split):
+    # Memory-mapped: only the rows we print are actually read
+    ds = load_dataset(f"{DATASET_DIR}/{split}")
+    print(f"\n{split} split (vectorized):")
+    print("-" * 40)
+    print(f"Shape: {ds.shape}, non-zeros: {ds.nnz}")
+    print(f"Labels: {dict(zip(*np.unique(ds.labels, return_counts=True)))}")
+    return ds
+
+
+# Load all files (a split that was never generated locally is skipped)
+splits = {}
+for split in ("train", "test"):
+    if Path(DATASET_DIR, split).exists():
+        splits[split] = inspect_dataset(split)
+if not splits:
+    sys.exit(f"No vectorized splits in {DATASET_DIR}/ — run 02_split_and_vectorize.py first.")
 vectorizer = inspect_pickle("data/tfidf_vectorizer.pkl", "TF-IDF Vectorizer")
+X_sample, y_sample = next(iter(splits.values())).rows(0, 1)
 
 # Show tokens learned by the vectorizer
 print("\nFirst 20 tokens in vocabulary:")
@@ -33,22 +54,22 @@ print(vectorizer.get_feature_names_out()[:20])
 
 # Show one example
 print("\nOriginal tweet text sample (cleaned):")
-print(X_train[0])  # sparse matrix
+print(X_sample)  # sparse matrix
 
 print("\nCorresponding label:")
-print(y_train.iloc[0])  # 0 or 1
+print(y_sample[0])  # 0 or 1
 
 # Show sparse vector for the same tweet
 print("\nSparse vector (non-zero tf-idf values):")
-print(X_train[0])
+print(X_sample)
 
 # Optional: count how many non-zero elements in this vector
-print("\nNumber of non-zero elements in vector:", X_train[0].count_nonzero())
+print("\nNumber of non-zero elements in vector:", X_sample.count_nonzero())
 
 # Decode vector to actual words
 print("\nDecoded words in tweet 0:")
 vocab = vectorizer.get_feature_names_out()
-vector_row = X_train[0]
+vector_row = X_sample
 indices = vector_row.indices
 for i in indices:
     print(f"- {vocab[i]}")
\ No newline at end of file
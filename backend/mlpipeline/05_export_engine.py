@@ -0,0 +1,83 @@
+# This script compiles the trained vectorizer + model into the NumPy-only engine the app serves.
+# It pulls the vocabulary, IDF weights, coefficients and intercepts out of the pickles,
+# checks that the engine predicts exactly like sklearn, and only then writes the artifact
+# (plain .npy arrays + a manifest the app memory-maps, so no pickle at serve time).
+# Run it after 03_train_model.py. The artifact is published to the model registry and
+# made current; running workers swap it in within MODEL_POLL_SECONDS, no restart needed.
+
+import pickle
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Make backend/ importable so we share the engine code with the app
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ml.artifacts import load_engine  # noqa: E402
+from ml.datasets import DATASET_DIR, load_dataset  # noqa: E402
+from ml.engine import LinearTextEngine  # noqa: E402
+from ml.registry import REGISTRY_DIR, activate, publish, version_dir  # noqa: E402
+
+# ───────────────────────────────────────
+# 1. Load the sklearn artifacts
+# ───────────────────────────────────────
+with open("data/tfidf_vectorizer.pkl", "rb") as f:
+    vectorizer = pickle.load(f)
+
+with open("data/sentiment_model.pkl", "rb") as f:
+    model = pickle.load(f)
+
+X_test = load_dataset(f"{DATASET_DIR}/test").matrix()
+
+# ───────────────────────────────────────
+# 2. Compile the engine
+# ───────────────────────────────────────
+engine = LinearTextEngine.from_sklearn(vectorizer, model)
+
+# ───────────────────────────────────────
+# 3. Parity checks (abort on any mismatch)
+# ───────────────────────────────────────
+# a) Scoring: same predictions on the whole vectorized test set
+sk_pred = model.predict(X_test)
+engine_pred = engine.predict_csr(X_test.indptr, X_test.indices, X_test.data)
+mismatches = int((sk_pred != engine_pred).sum())
+print(f"X_test parity: {len(sk_pred) - mismatches}/{len(sk_pred)} identical predictions")
+if mismatches:
+    sys.exit("❌ Engine predictions differ from sklearn on X_test — not exporting.")
+
+# b) Tokenizer + TF-IDF: synthetic texts built from the vocabulary, with casing,
+#    punctuation, accents and out-of-vocabulary noise mixed in
+rng = random.Random(42)
+# (with stemming the vocabulary holds stems, so the raw tokens of the stem table go in too)
+terms = list(vectorizer.vocabulary_) + list(getattr(vectorizer.tokenizer, "table", {}))
+noise = ["!!", ":)", "123", "a", "Ação", "https://x.co/y", "@user", "#tag", "é", "—", "não,", "çÃO"]
+texts = [""]
+for _ in range(2000):
+    words = rng.sample(terms, rng.randint(1, 12)) + rng.sample(noise, rng.randint(0, 3))
+    rng.shuffle(words)
+    texts.append(" ".join(w.upper() if rng.random() < 0.1 else w for w in words))
+
+sk_X = vectorizer.transform(texts)
+indptr, indices, data = engine.transform(texts)
+same_structure = np.array_equal(sk_X.indptr, indptr) and np.array_equal(sk_X.indices, indices)
+if not same_structure or not np.allclose(sk_X.data, data, rtol=0, atol=1e-12):
+    sys.exit("❌ Engine TF-IDF features differ from sklearn — not exporting.")
+if (model.predict(sk_X) != engine.predict(texts)).any():
+    sys.exit("❌ Engine predictions differ from sklearn on synthetic texts — not exporting.")
+print(f"Tokenizer parity: {len(texts)} synthetic texts vectorized identically")
+
+# ───────────────────────────────────────
+# 4. Publish the engine artifact (.npy arrays + manifest.json, no pickle)
+# ───────────────────────────────────────
+# Staged first, checked, and only then made current
+version = publish(engine, REGISTRY_DIR, make_current=False)
+artifact_dir = version_dir(REGISTRY_DIR, version)
+
+# Round-trip: the memory-mapped artifact must predict like the in-memory engine
+reloaded = load_engine(artifact_dir, verify=True)
+if (reloaded.predict_csr(X_test.indptr, X_test.indices, X_test.data) != engine_pred).any():
+    sys.exit(f"❌ Reloaded artifact predicts differently — check the files in {artifact_dir}")
+
+activate(REGISTRY_DIR, version)
+print(f"\n✅ Engine compiled and published to '{artifact_dir}' as the current model (version {version})")
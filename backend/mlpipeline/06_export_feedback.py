@@ -0,0 +1,211 @@
+# This script pulls user feedback out of the database so it can go back into training.
+# It streams rows in (created_at, id) order, one page at a time, and writes each page as its own
+# CSV/Parquet chunk with the same column names as the raw dataset (tweet_text, revised_sentiment),
+# so 01_preprocess_data.py can read the chunks directly.
+# A watermark file remembers the last exported row, so the next run only exports what's new.
+# created_at is set when a row is inserted, not when its transaction commits, so a row can
+# show up after a later one was exported. Each run therefore re-reads the last --lag-seconds
+# before the watermark and skips the ids it already exported (kept in the watermark file);
+# rows committed more than that late are still missed (--full re-exports everything).
+# "submissions" is the feedback_stats count at export time: repeats submitted after a row
+# was exported only bump feedback_stats and don't re-export it, so use --full when fresh
+# counts matter.
+#
+# Usage (from backend/):
+#   python mlpipeline/06_export_feedback.py                      # new rows since last export, CSV
+#   python mlpipeline/06_export_feedback.py --format parquet     # needs pyarrow
+#   python mlpipeline/06_export_feedback.py --full               # ignore the watermark
+#   python mlpipeline/01_preprocess_data.py --input "data/feedback_export/*.csv"
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import and_, bindparam, create_engine, func, select, String, tuple_
+
+# Make backend/ importable so we reuse the app's DB URL and table definitions
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config.db import DATABASE_READ_URL, DATABASE_URL  # noqa: E402
+from models.feedback import Feedback, FeedbackStats  # noqa: E402
+
+OUT_DIR = "data/feedback_export"
+WATERMARK_NAME = ".watermark.json"
+
+# DB column -> exported column (first two match data/sentiment_dataset.csv)
+COLUMNS = {
+    "text": "tweet_text",
+    "correct_label": "revised_sentiment",
+    "predicted_label": "predicted_label",
+    "submissions": "submissions",
+    "text_hash": "text_hash",
+    "created_at": "created_at",
+    "id": "feedback_id",
+}
+
+
+# ───────────────────────────────────────
+# Watermark helpers
+# ───────────────────────────────────────
+def load_watermark(path: Path):
+    """((created_at, id) of the newest exported row, {id: created_at} exported near it) or None."""
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        mark = json.load(f)
+    # Watermarks from before the lag window have no "recent" list
+    recent = {int(row_id): datetime.fromisoformat(ts) for ts, row_id in mark.get("recent", [])}
+    return (datetime.fromisoformat(mark["created_at"]), int(mark["id"])), recent
+
+
+def save_watermark(path: Path, newest, recent: dict) -> None:
+    created_at, row_id = newest
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": created_at.isoformat(),
+            "id": row_id,
+            "recent": sorted([ts.isoformat(), i] for i, ts in recent.items()),
+        }, f)
+    tmp.replace(path)  # atomic, so a crash never leaves a half-written watermark
+
+
+def timestamp_param(ts: datetime, dialect: str):
+    # SQLite stores CURRENT_TIMESTAMP as 'YYYY-MM-DD HH:MM:SS' text; compare in that
+    # format (SQLAlchemy would bind '... .000000', which sorts after equal timestamps)
+    if dialect == "sqlite":
+        fmt = "%Y-%m-%d %H:%M:%S.%f" if ts.microsecond else "%Y-%m-%d %H:%M:%S"
+        return bindparam("wm_ts", ts.strftime(fmt), type_=String)
+    return bindparam("wm_ts", ts, type_=Feedback.created_at.type)
+
+
+# ───────────────────────────────────────
+# Export
+# ───────────────────────────────────────
+def build_query(page_size: int, after, dialect: str, since=None):
+    fb = Feedback.__table__
+    stats = FeedbackStats.__table__
+    stmt = (
+        select(
+            fb.c.id,
+            fb.c.created_at,
+            fb.c.text,
+            fb.c.predicted_label,
+            fb.c.correct_label,
+            fb.c.text_hash,
+            func.coalesce(stats.c.submissions, 1).label("submissions"),
+        )
+        .select_from(
+            fb.outerjoin(
+                stats,
+                and_(
+                    stats.c.text_hash == fb.c.text_hash,
+                    stats.c.predicted_label == fb.c.predicted_label,
+                    stats.c.correct_label == fb.c.correct_label,
+                ),
+            )
+        )
+        # Keyset pagination: walks ix_feedback_created_at, no OFFSET scans
+        .order_by(fb.c.created_at, fb.c.id)
+        .limit(page_size)
+    )
+    if after is not None:
+        ts, row_id = after
+        stmt = stmt.where(
+            tuple_(fb.c.created_at, fb.c.id) > tuple_(timestamp_param(ts, dialect), bindparam("wm_id", row_id))
+        )
+    elif since is not None:
+        stmt = stmt.where(fb.c.created_at >= timestamp_param(since, dialect))
+    return stmt
+
+
+def write_chunk(df: pd.DataFrame, path: Path, fmt: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    if fmt == "parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False)
+    tmp.replace(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream feedback rows out for retraining.")
+    parser.add_argument("--out-dir", default=OUT_DIR)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="rows per output file")
+    parser.add_argument("--fetch-size", type=int, default=5000, help="rows per DB round trip")
+    parser.add_argument("--full", action="store_true", help="ignore the watermark and export everything")
+    parser.add_argument("--lag-seconds", type=float, default=300,
+                        help="re-read this much before the watermark for rows that committed late")
+    parser.add_argument("--database-url", default=DATABASE_READ_URL or DATABASE_URL,
+                        help="default: the read replica (DATABASE_READ_URL) if set, else DATABASE_URL")
+    args = parser.parse_args()
+
+    if args.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit("Parquet output needs pyarrow: pip install pyarrow (or use --format csv)")
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    watermark_path = out_dir / WATERMARK_NAME
+    mark = None if args.full else load_watermark(watermark_path)
+    lag = timedelta(seconds=args.lag_seconds)
+    after = since = newest = None
+    exported = {}  # id -> created_at of rows exported within `lag` of the newest one
+    if mark is not None:
+        newest, exported = mark
+        if exported:
+            since = newest[0] - lag
+        else:
+            after = newest  # old watermark: no id list to dedupe a re-read with
+    print(f"Exporting feedback {'since ' + str(newest[0]) + ' (id ' + str(newest[1]) + ')' if newest else 'from the beginning'}"
+          + (f", re-checking the {args.lag_seconds:g}s before it" if since is not None else ""))
+
+    engine = create_engine(args.database_url)
+    dialect = engine.dialect.name
+    run_tag = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    total = chunk_no = 0
+
+    while True:
+        stmt = build_query(args.chunk_size, after, dialect, since)
+        parts = []
+        # Short transaction per page; server-side cursor + yield_per inside it,
+        # so at most one page is ever held in memory
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=args.fetch_size).execute(stmt)
+            for rows in result.partitions():
+                parts.append(pd.DataFrame(rows, columns=list(result.keys())))
+        if not parts:
+            break
+
+        page = pd.concat(parts, ignore_index=True)[list(COLUMNS)].rename(columns=COLUMNS)
+        last = page.iloc[-1]
+        after = (pd.Timestamp(last["created_at"]).to_pydatetime(), int(last["feedback_id"]))
+        fetched = len(page)
+        page = page[~page["feedback_id"].isin(list(exported))]
+
+        if len(page):
+            chunk_no += 1
+            path = out_dir / f"feedback_{run_tag}_{chunk_no:05d}.{args.format}"
+            write_chunk(page, path, args.format)
+            stamps = [pd.Timestamp(ts).to_pydatetime() for ts in page["created_at"]]
+            exported.update(zip(page["feedback_id"].astype(int).tolist(), stamps))
+            page_newest = (stamps[-1], int(page["feedback_id"].iloc[-1]))
+            newest = page_newest if newest is None else max(newest, page_newest)
+            # Only ids a later re-read can still reach need remembering
+            exported = {i: ts for i, ts in exported.items() if ts >= newest[0] - lag}
+            save_watermark(watermark_path, newest, exported)
+            total += len(page)
+            print(f"  wrote {len(page):>7} rows -> {path}")
+        if fetched < args.chunk_size:
+            break
+
+    print(f"\n✅ Exported {total} feedback rows in {chunk_no} chunk(s) to {out_dir}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# This script updates the served model with new feedback without a full retrain.
+# The vocabulary and IDF weights stay frozen (so no re-vectorizing of the whole dataset);
+# only the classifier weights move, starting from the current model and taking a few
+# SGD steps (partial_fit) over mini-batches of feedback rows labelled with correct_label.
+# By default the result must not score worse than the current model on the held-out
+# X_test/y_test, otherwise it isn't published (--max-regression allows a small drop).
+# Takes seconds instead of re-running 02 + 03.
+# A promoted model becomes the registry's current version and workers hot-swap to it.
+#
+# Usage (from backend/):
+#   python mlpipeline/06_export_feedback.py
+#   python mlpipeline/07_incremental_update.py --input "data/feedback_export/*.csv"
+
+import argparse
+import glob
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.linear_model import SGDClassifier
+
+# Make backend/ importable so we share the engine, artifact and cleaning code with the app
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ml.artifacts import load_engine  # noqa: E402
+from ml.datasets import DATASET_DIR, load_dataset  # noqa: E402
+from ml.registry import REGISTRY_DIR, current_dir, publish  # noqa: E402
+from ml.preprocess import clean_many  # noqa: E402
+
+
+def load_feedback(patterns):
+    paths = sorted(p for pattern in patterns for p in glob.glob(pattern))
+    if not paths:
+        sys.exit(f"No feedback files match {patterns} — run 06_export_feedback.py first.")
+    frames = [pd.read_parquet(p) if p.endswith(".parquet") else pd.read_csv(p) for p in paths]
+    print(f"Loaded {len(paths)} feedback file(s)")
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally update the model from feedback.")
+    parser.add_argument("--input", nargs="+", default=["data/feedback_export/*.csv"])
+    parser.add_argument("--registry", default=REGISTRY_DIR, help="model registry to read from and publish to")
+    parser.add_argument("--model-dir", help="base model artifact (default: the registry's current version)")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--eta0", type=float, default=0.01, help="SGD learning rate")
+    parser.add_argument("--alpha", type=float, default=1e-5, help="L2 regularization")
+    parser.add_argument("--max-regression", type=float, default=0.0,
+                        help="largest accuracy drop on X_test allowed for promotion (default: none)")
+    parser.add_argument("--dry-run", action="store_true", help="evaluate only, never write")
+    args = parser.parse_args()
+    started = time.perf_counter()
+
+    # ───────────────────────────────────────
+    # 1. Current model + held-out evaluation set
+    # ───────────────────────────────────────
+    base = load_engine(args.model_dir or current_dir(args.registry), mmap=False)
+    test = load_dataset(f"{DATASET_DIR}/test")
+    X_test, y_test = test.matrix(), test.labels
+    if X_test.shape[1] != base.idf.shape[0]:
+        # A pruned artifact (10_optimize_artifact.py) no longer has the vectorizer's columns
+        sys.exit(f"❌ The base model has {base.idf.shape[0]} features but X_test has {X_test.shape[1]} "
+                 "— update the unpruned model it came from (--model-dir) and optimize the result.")
+
+    # ───────────────────────────────────────
+    # 2. Feedback rows -> frozen TF-IDF features
+    # ───────────────────────────────────────
+    df = load_feedback(args.input)
+    known = df["revised_sentiment"].isin(base.classes)
+    if (~known).any():
+        print(f"Skipping {int((~known).sum())} rows whose label isn't one of the model's classes {[int(c) for c in base.classes]}")
+    df = df[known]
+    if df.empty:
+        sys.exit("No usable feedback rows.")
+
+    indptr, indices, data = base.transform(clean_many(df["tweet_text"]).tolist())
+    X_new = sp.csr_matrix((data, indices, indptr), shape=(len(df), base.idf.shape[0]))
+    y_new = df["revised_sentiment"].to_numpy()
+    # Repeated submissions count more (column written by 06_export_feedback.py)
+    weights = df["submissions"].to_numpy(dtype=np.float64) if "submissions" in df else np.ones(len(df))
+
+    # ───────────────────────────────────────
+    # 3. Warm-started SGD over mini-batches
+    # ───────────────────────────────────────
+    clf = SGDClassifier(loss="log_loss", alpha=args.alpha, learning_rate="constant",
+                        eta0=args.eta0, random_state=42)
+    # Allocate the weights with a zero-weight step, then start from the current model
+    clf.partial_fit(X_new[:1], y_new[:1], classes=base.classes, sample_weight=np.zeros(1))
+    clf.coef_[...] = base.float_coef
+    clf.intercept_[...] = base.intercept
+
+    rng = np.random.default_rng(42)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for _ in range(args.epochs):
+            order = rng.permutation(len(y_new))
+            for start in range(0, len(order), args.batch_size):
+                batch = order[start:start + args.batch_size]
+                clf.partial_fit(X_new[batch], y_new[batch], sample_weight=weights[batch])
+
+    candidate = base.with_weights(clf.coef_.astype(np.float64), clf.intercept_.astype(np.float64))
+    print(f"Trained on {len(y_new)} feedback rows in {time.perf_counter() - started:.2f}s")
+
+    # ───────────────────────────────────────
+    # 4. Evaluation gate on the held-out test set
+    # ───────────────────────────────────────
+    base_acc = float((base.predict_csr(X_test.indptr, X_test.indices, X_test.data) == y_test).mean())
+    cand_acc = float((candidate.predict_csr(X_test.indptr, X_test.indices, X_test.data) == y_test).mean())
+    print(f"\nX_test accuracy: current {base_acc:.4f} -> candidate {cand_acc:.4f} ({cand_acc - base_acc:+.4f})")
+
+    if cand_acc < base_acc - args.max_regression:
+        sys.exit(f"❌ Candidate is worse than allowed (max regression {args.max_regression}) — not promoted.")
+    if args.dry_run:
+        print("Dry run — nothing written.")
+        return
+
+    version = publish(candidate, args.registry, extra={
+        "parent_version": base.version,
+        "incremental_update": {
+            "feedback_rows": int(len(y_new)),
+            "x_test_accuracy": cand_acc,
+            "parent_x_test_accuracy": base_acc,
+        },
+    })
+    print(f"\n✅ Promoted model version {version} in '{args.registry}' "
+          f"({time.perf_counter() - started:.2f}s total)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# This script searches for better TF-IDF + LogisticRegression settings instead of hand-editing 02/03.
+# It cross-validates every combination of the grid below on the training split only (same
+# 80/20 split as 02_split_and_vectorize.py, so the test set stays untouched), across all cores.
+#
+# Vectorized folds are cached on disk under a key made of the data + fold layout + vectorizer
+# params, so changing only classifier settings (C, solver) never re-tokenizes anything, and a
+# second run with a bigger grid only vectorizes what's new.
+#
+# Output: a leaderboard (accuracy, macro-F1, fit time, serving latency per config) and
+# best_params.json, which 02 and 03 accept via --params.
+#
+# Usage (from backend/):
+#   python mlpipeline/08_tune_hyperparams.py                       # default grid, 5 folds
+#   python mlpipeline/08_tune_hyperparams.py --grid my_grid.json --jobs 4
+#   python mlpipeline/02_split_and_vectorize.py --params data/tuning/best_params.json
+#   python mlpipeline/03_train_model.py --params data/tuning/best_params.json
+
+import argparse
+import hashlib
+import itertools
+import json
+import shutil
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+# Make backend/ importable so latency is measured on the engine the app serves
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ml.datasets import DATASET_FORMAT, FORMAT_VERSION, load_dataset, save_dataset  # noqa: E402
+from ml.engine import LinearTextEngine  # noqa: E402
+from ml.stemming import build_vectorizer  # noqa: E402
+
+CACHE_DIR = "data/tuning_cache"
+OUT_DIR = "data/tuning"
+LATENCY_TEXTS = 500  # validation texts timed one at a time, like /predict
+
+# Searched when no --grid file is given. JSON grids use the same shape
+# (ngram_range as [min, max] lists; stemmer null for none).
+DEFAULT_GRID = {
+    "vectorizer": {
+        "ngram_range": [(1, 1), (1, 2)],
+        "max_features": [5000, 20000],
+        "min_df": [1, 2, 5],
+        "sublinear_tf": [False, True],
+        "stemmer": [None, "snowball"],
+    },
+    "classifier": {
+        "C": [0.25, 1.0, 4.0],
+        # Multinomial solvers only: liblinear fits one-vs-rest, which the engine rejects
+        "solver": ["lbfgs", "saga"],
+    },
+}
+
+
+# ───────────────────────────────────────
+# Grid + cache keys
+# ───────────────────────────────────────
+def expand(grid: dict):
+    names = sorted(grid)
+    for values in itertools.product(*(grid[n] for n in names)):
+        params = dict(zip(names, values))
+        if "ngram_range" in params:
+            params["ngram_range"] = tuple(params["ngram_range"])
+        yield params
+
+
+def stable_key(*parts) -> str:
+    blob = json.dumps(parts, sort_keys=True, default=list).encode()
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def data_fingerprint(texts: pd.Series, labels: pd.Series) -> str:
+    hashed = pd.util.hash_pandas_object(pd.DataFrame({"t": texts, "y": labels}), index=False)
+    return hashlib.sha256(hashed.to_numpy().tobytes()).hexdigest()[:16]
+
+
+# ───────────────────────────────────────
+# Worker tasks (run in joblib processes)
+# ───────────────────────────────────────
+def vectorize_fold(texts, labels, train_idx, val_idx, vec_params, fold_dir: Path, fold: int):
+    """Fit the vectorizer on one fold's train part and cache both splits."""
+    start = time.perf_counter()
+    vectorizer = build_vectorizer(vec_params, texts[train_idx])
+    X_train = vectorizer.fit_transform(texts[train_idx])
+    X_val = vectorizer.transform(texts[val_idx])
+    save_dataset(fold_dir / f"fold{fold}_train", X_train, labels[train_idx])
+    save_dataset(fold_dir / f"fold{fold}_val", X_val, labels[val_idx])
+    if fold == 0:
+        joblib.dump(vectorizer, fold_dir / "fold0_vectorizer.joblib")  # for latency timing
+    with open(fold_dir / f"fold{fold}.json", "w", encoding="utf-8") as f:
+        json.dump({"vectorize_sec": time.perf_counter() - start, "n_features": X_train.shape[1]}, f)
+
+
+def evaluate(fold_dir: Path, fold: int, clf_params, latency_texts=None):
+    # Memory-mapped: parallel workers share the cached folds through the page cache
+    train = load_dataset(fold_dir / f"fold{fold}_train")
+    val = load_dataset(fold_dir / f"fold{fold}_val")
+    y_val = val.labels
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # convergence warnings are expected for some grid points
+        model = LogisticRegression(max_iter=1000, **clf_params).fit(train.matrix(), train.labels)
+    fit_sec = time.perf_counter() - start
+    y_pred = model.predict(val.matrix())
+    row = {
+        "fold": fold,
+        "accuracy": accuracy_score(y_val, y_pred),
+        "macro_f1": f1_score(y_val, y_pred, average="macro"),
+        "fit_sec": fit_sec,
+    }
+
+    if latency_texts is not None:
+        # Serving cost = the compiled engine on single texts, as /predict runs it
+        engine = LinearTextEngine.from_sklearn(joblib.load(fold_dir / "fold0_vectorizer.joblib"), model)
+        timings = []
+        for text in latency_texts:
+            t0 = time.perf_counter()
+            engine.predict([text])
+            timings.append(time.perf_counter() - t0)
+        batch_start = time.perf_counter()
+        engine.predict(list(latency_texts))
+        row["latency_p50_us"] = float(np.percentile(timings, 50) * 1e6)
+        row["latency_p95_us"] = float(np.percentile(timings, 95) * 1e6)
+        row["batch_us_per_text"] = (time.perf_counter() - batch_start) * 1e6 / len(latency_texts)
+    return row
+
+
+# ───────────────────────────────────────
+# Main
+# ───────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter search.")
+    parser.add_argument("--input", default="data/cleaned_dataset.csv")
+    parser.add_argument("--grid", help="JSON file with {'vectorizer': {...}, 'classifier': {...}}")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel workers (-1 = all cores)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--out-dir", default=OUT_DIR)
+    parser.add_argument("--metric", choices=["accuracy", "macro_f1"], default="macro_f1",
+                        help="leaderboard ranking")
+    parser.add_argument("--clear-cache", action="store_true")
+    args = parser.parse_args()
+    started = time.perf_counter()
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid, encoding="utf-8") as f:
+            grid = json.load(f)
+    vec_configs = list(expand(grid["vectorizer"]))
+    clf_configs = list(expand(grid["classifier"]))
+
+    # ───────────────────────────────────────
+    # 1. Training split only (same split as 02) + fold layout
+    # ───────────────────────────────────────
+    df = pd.read_parquet(args.input) if args.input.endswith(".parquet") else pd.read_csv(args.input)
+    df = df.dropna(subset=["cleaned_text"])
+    X_train, _, y_train, _ = train_test_split(
+        df["cleaned_text"], df["revised_sentiment"], test_size=0.2, random_state=42,
+        stratify=df["revised_sentiment"],
+    )
+    texts = X_train.to_numpy(dtype=object)
+    labels = y_train.to_numpy()
+    folds = list(StratifiedKFold(args.folds, shuffle=True, random_state=42).split(texts, labels))
+    data_key = stable_key(data_fingerprint(X_train, y_train), args.folds, DATASET_FORMAT, FORMAT_VERSION)
+    print(f"{len(texts)} training rows, {args.folds} folds, "
+          f"{len(vec_configs)} vectorizer x {len(clf_configs)} classifier configs")
+
+    cache_dir = Path(args.cache_dir)
+    if args.clear_cache:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def fold_dir(vec_params):
+        return cache_dir / stable_key(data_key, vec_params)
+
+    # ───────────────────────────────────────
+    # 2. Vectorize whatever isn't cached yet
+    # ───────────────────────────────────────
+    todo = [
+        (vec, k) for vec in vec_configs for k in range(args.folds)
+        if not (fold_dir(vec) / f"fold{k}.json").exists()
+    ]
+    print(f"Vectorizing {len(todo)} fold(s), {len(vec_configs) * args.folds - len(todo)} cached")
+    Parallel(n_jobs=args.jobs)(
+        delayed(vectorize_fold)(texts, labels, folds[k][0], folds[k][1], vec, fold_dir(vec), k) for vec, k in todo
+    )
+
+    # ───────────────────────────────────────
+    # 3. Fit + score every (vectorizer, classifier, fold)
+    # ───────────────────────────────────────
+    latency_texts = list(texts[folds[0][1][:LATENCY_TEXTS]])
+    tasks = [(vec, clf, k) for vec in vec_configs for clf in clf_configs for k in range(args.folds)]
+    print(f"Fitting {len(tasks)} models")
+    rows = Parallel(n_jobs=args.jobs)(
+        delayed(evaluate)(fold_dir(vec), k, clf, latency_texts if k == 0 else None)
+        for vec, clf, k in tasks
+    )
+
+    # ───────────────────────────────────────
+    # 4. Leaderboard
+    # ───────────────────────────────────────
+    records = []
+    for (vec, clf, k), row in zip(tasks, rows):
+        with open(fold_dir(vec) / f"fold{k}.json", encoding="utf-8") as f:
+            fold_meta = json.load(f)
+        records.append({
+            "config": stable_key(vec, clf),
+            **{f"vec_{n}": str(v) if isinstance(v, tuple) else v for n, v in vec.items()},
+            **{f"clf_{n}": v for n, v in clf.items()},
+            "n_features": fold_meta["n_features"],
+            **row,
+        })
+    folds_df = pd.DataFrame(records)
+    param_cols = [c for c in folds_df.columns if c.startswith(("vec_", "clf_"))]
+    board = folds_df.groupby(["config"] + param_cols, dropna=False).agg(
+        accuracy=("accuracy", "mean"),
+        accuracy_std=("accuracy", "std"),
+        macro_f1=("macro_f1", "mean"),
+        macro_f1_std=("macro_f1", "std"),
+        fit_sec=("fit_sec", "mean"),
+        n_features=("n_features", "mean"),
+        latency_p50_us=("latency_p50_us", "max"),
+        latency_p95_us=("latency_p95_us", "max"),
+        batch_us_per_text=("batch_us_per_text", "max"),
+    ).reset_index().sort_values([args.metric, "latency_p50_us"], ascending=[False, True])
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    board.to_csv(out_dir / "leaderboard.csv", index=False)
+    folds_df.to_csv(out_dir / "folds.csv", index=False)
+
+    best = board.iloc[0]
+    best_config = next((vec, clf) for vec, clf, _ in tasks if stable_key(vec, clf) == best["config"])
+    with open(out_dir / "best_params.json", "w", encoding="utf-8") as f:
+        json.dump({"vectorizer": best_config[0], "classifier": best_config[1],
+                   "cv": {"folds": args.folds, "accuracy": best["accuracy"], "macro_f1": best["macro_f1"]}},
+                  f, indent=2, default=list)
+
+    shown = param_cols + ["accuracy", "macro_f1", "fit_sec", "latency_p50_us"]
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print("\nTop 10 by", args.metric)
+        print(board[shown].head(10).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"\n✅ Leaderboard in '{out_dir}/leaderboard.csv', best params in '{out_dir}/best_params.json' "
+          f"({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# This script re-scores big archives (CSV / NDJSON / Parquet, millions of rows) with a model
+# from the registry, without going through the API.
+# The input is streamed in chunks; each chunk is cleaned, vectorized and scored in a process
+# pool whose workers open the artifact once (memory-mapped, so they share its pages).
+# Scored chunks are appended to the output in input order, and after each one a checkpoint
+# file records how far we got, so an interrupted run picks up where it stopped.
+#
+# Usage (from backend/):
+#   python mlpipeline/09_bulk_score.py --input archive.csv --output data/scored.csv
+#   python mlpipeline/09_bulk_score.py --input tweets.ndjson --output scored.ndjson --proba --workers 8
+#   (run the same command again after a crash or Ctrl-C to resume; --restart starts over)
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Make backend/ importable so we score with the same cleaning + engine as the API
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ml.artifacts import load_engine, read_manifest  # noqa: E402
+from ml.parallel import ordered_map  # noqa: E402
+from ml.preprocess import clean_many  # noqa: E402
+from ml.registry import REGISTRY_DIR, current_dir  # noqa: E402
+
+NDJSON_SUFFIXES = (".ndjson", ".jsonl", ".json")
+
+
+# ───────────────────────────────────────
+# Input / output
+# ───────────────────────────────────────
+def _base_name(path: str) -> str:
+    return path[:-3] if path.endswith(".gz") else path
+
+
+def iter_chunks(path, chunksize):
+    name = _base_name(path)
+    if name.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    elif name.endswith(NDJSON_SUFFIXES):
+        yield from pd.read_json(path, lines=True, chunksize=chunksize, dtype=False)
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def append_chunk(path, df, first: bool) -> int:
+    """Append `df` to the output, fsync it and return the new file size."""
+    with open(path, "w" if first else "a", encoding="utf-8", newline="") as f:
+        if path.endswith(NDJSON_SUFFIXES):
+            df.to_json(f, orient="records", lines=True, force_ascii=False)
+        else:
+            df.to_csv(f, header=first, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+# ───────────────────────────────────────
+# Checkpoint
+# ───────────────────────────────────────
+def load_checkpoint(path: Path):
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: Path, state: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    tmp.replace(path)  # atomic, so a crash never leaves a half-written checkpoint
+
+
+# ───────────────────────────────────────
+# Worker side: one engine per process
+# ───────────────────────────────────────
+_engine = None
+
+
+def init_worker(artifact_dir: str) -> None:
+    global _engine
+    _engine = load_engine(artifact_dir)
+
+
+def score_texts(args):
+    texts, with_proba = args
+    cleaned = clean_many(pd.Series(texts, dtype=object))
+    preds, proba, _ = _engine.score_csr(*_engine.transform(cleaned.tolist()))
+    return cleaned.to_numpy(), preds, (proba if with_proba else None)
+
+
+# ───────────────────────────────────────
+# Main
+# ───────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description="Score a large file with a model from the registry.")
+    parser.add_argument("--input", required=True, help="CSV, NDJSON (.ndjson/.jsonl) or Parquet; .gz ok")
+    parser.add_argument("--output", required=True, help="CSV, or NDJSON if it ends in .ndjson/.jsonl")
+    parser.add_argument("--text-column", default="tweet_text")
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=0, help="scoring processes (default: all cores)")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    parser.add_argument("--model-dir", help="artifact to use (default: the registry's current version)")
+    parser.add_argument("--proba", action="store_true", help="add a probability column per class")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args()
+    if args.output.endswith((".parquet", ".gz")):
+        # Resuming truncates the output back to the last checkpoint, which only works
+        # for plain appendable text (a Parquet footer or gzip stream can't be cut)
+        sys.exit(f"❌ --output must be CSV or NDJSON (uncompressed), got {args.output}")
+
+    # Resolve the artifact once: a model activated mid-run doesn't change this run
+    artifact_dir = str(args.model_dir or current_dir(args.registry))
+    manifest = read_manifest(artifact_dir)
+    version = manifest["model_version"]
+    classes = manifest["classes"]
+
+    checkpoint_path = Path(args.output + ".checkpoint.json")
+    run_key = {
+        "input": os.path.abspath(args.input),
+        "text_column": args.text_column,
+        "chunksize": args.chunksize,
+        "model_version": version,
+        "proba": args.proba,
+    }
+    state = None if args.restart else load_checkpoint(checkpoint_path)
+    if state is not None and state["run"] != run_key:
+        sys.exit(f"❌ {checkpoint_path} belongs to a different run ({state['run']}) — use --restart.")
+    if state is not None and state.get("complete"):
+        print(f"Already complete: {state['rows_done']} rows in {args.output} (--restart to redo)")
+        return
+    if state is None:
+        state = {"run": run_key, "chunks_done": 0, "rows_done": 0, "output_bytes": 0, "complete": False}
+    elif not os.path.exists(args.output):
+        sys.exit(f"❌ {args.output} is gone but {checkpoint_path} says {state['rows_done']} rows were written "
+                 "— use --restart.")
+    else:
+        # Drop anything written after the last checkpoint (a chunk cut off mid-write)
+        with open(args.output, "r+b") as f:
+            f.truncate(state["output_bytes"])
+        print(f"Resuming after {state['rows_done']} rows ({state['chunks_done']} chunks)")
+
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Scoring {args.input} with model {version}, {workers} worker(s), chunks of {args.chunksize} rows")
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(artifact_dir,))
+    in_flight = deque()
+    skip = state["chunks_done"]
+
+    def text_batches():
+        for i, chunk in enumerate(iter_chunks(args.input, args.chunksize)):
+            if i < skip:
+                continue  # scored in a previous run
+            in_flight.append(chunk)
+            yield chunk[args.text_column].fillna("").astype(str).to_numpy(), args.proba
+
+    started = time.perf_counter()
+    rows = 0
+    try:
+        # At most 2 chunks per worker are in memory at any time
+        for cleaned, preds, proba in ordered_map(pool, score_texts, text_batches(), max_in_flight=2 * workers):
+            chunk = in_flight.popleft()
+            chunk["cleaned_text"] = cleaned
+            chunk["prediction"] = preds
+            if proba is not None:
+                for j, label in enumerate(classes):
+                    chunk[f"proba_{label}"] = np.round(proba[:, j], 6)
+            chunk["model_version"] = version
+
+            state["output_bytes"] = append_chunk(args.output, chunk, first=state["rows_done"] == 0)
+            state["chunks_done"] += 1
+            state["rows_done"] += len(chunk)
+            save_checkpoint(checkpoint_path, state)
+
+            rows += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"  scored {state['rows_done']} rows ({rows / elapsed:,.0f} rows/s)", end="\r", flush=True)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    state["complete"] = True
+    save_checkpoint(checkpoint_path, state)
+    elapsed = time.perf_counter() - started
+    print(f"\n\n✅ Scored {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s); "
+          f"{state['rows_done']} rows in '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
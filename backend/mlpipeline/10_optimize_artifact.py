@@ -0,0 +1,148 @@
+# This script shrinks a model artifact for serving: it prunes features whose coefficients
+# are near zero for every class, stores the weights as int8 (or float32) with scales, and
+# keeps the vocabulary as a sorted UTF-8 byte-string table (see ml/optimize.py).
+# The optimized artifact is published to the registry next to its source and compared
+# with it: size on disk, load time, per-request latency and X_test/y_test accuracy.
+# It only becomes the current model with --activate, and only if accuracy holds.
+#
+# Usage (from backend/):
+#   python mlpipeline/10_optimize_artifact.py                      # report only, staged version
+#   python mlpipeline/10_optimize_artifact.py --prune-threshold 0.1 --weights float32
+#   python mlpipeline/10_optimize_artifact.py --activate --max-accuracy-drop 0.002
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Make backend/ importable so we share the engine and artifact code with the app
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ml.artifacts import load_engine  # noqa: E402
+from ml.datasets import DATASET_DIR, load_dataset  # noqa: E402
+from ml.optimize import WEIGHT_DTYPES, optimize_engine, project_rows  # noqa: E402
+from ml.registry import REGISTRY_DIR, activate, current_dir, publish, version_dir  # noqa: E402
+
+NOISE = ["!!", ":)", "123", "Ação", "@user", "#tag", "não,", "kkkk"]
+
+
+def dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.iterdir() if p.is_file())
+
+
+def load_seconds(path, mmap: bool, runs: int = 5) -> float:
+    """Median time to open the artifact and score a first text."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        load_engine(path, mmap=mmap).predict(["warm up"])
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def request_latencies(engines, texts):
+    """Per-engine single-text transform + score times (µs), interleaved so both see the same noise."""
+    samples = [[] for _ in engines]
+    for text in texts:
+        for engine, out in zip(engines, samples):
+            start = time.perf_counter()
+            engine.score_csr(*engine.transform([text]), top_k=5)
+            out.append((time.perf_counter() - start) * 1e6)
+    return [np.array(s) for s in samples]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune and quantize a model artifact for serving.")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    parser.add_argument("--model-dir", help="artifact to optimize (default: the registry's current version)")
+    parser.add_argument("--prune-threshold", type=float, default=0.05,
+                        help="drop features whose |coef| is below this for every class")
+    parser.add_argument("--weights", choices=WEIGHT_DTYPES, default="int8")
+    parser.add_argument("--requests", type=int, default=2000, help="texts timed for the latency report")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.005,
+                        help="largest X_test accuracy drop allowed for --activate")
+    parser.add_argument("--activate", action="store_true", help="make the optimized artifact current")
+    args = parser.parse_args()
+
+    # ───────────────────────────────────────
+    # 1. Source model + held-out evaluation set
+    # ───────────────────────────────────────
+    source_dir = Path(args.model_dir or current_dir(args.registry))
+    source = load_engine(source_dir, mmap=False)
+    test = load_dataset(f"{DATASET_DIR}/test")
+    X_test, y_test = test.matrix(), test.labels
+    if X_test.shape[1] != source.idf.shape[0]:
+        sys.exit(f"❌ {source_dir} has {source.idf.shape[0]} features but X_test has {X_test.shape[1]} "
+                 "— optimize the unpruned model it came from.")
+
+    # ───────────────────────────────────────
+    # 2. Prune + quantize, publish (not current yet) and reload from disk
+    # ───────────────────────────────────────
+    optimized, columns = optimize_engine(source, args.prune_threshold, args.weights)
+    version = publish(optimized, args.registry, make_current=False, extra={
+        "parent_version": source.version,
+        "optimized": {"prune_threshold": args.prune_threshold, "weights": args.weights},
+    })
+    target_dir = version_dir(args.registry, version)
+    optimized = load_engine(target_dir, verify=True)
+    print(f"Optimized {source.version} -> {version}: kept {len(columns)}/{source.idf.shape[0]} features "
+          f"(|coef| >= {args.prune_threshold}), {args.weights} weights\n")
+
+    # ───────────────────────────────────────
+    # 3. Report
+    # ───────────────────────────────────────
+    # a) Accuracy on X_test: the pruned engine sees the same rows projected into its features
+    source_idf = np.asarray(source.idf, dtype=np.float64)
+    projected = project_rows(X_test.indptr, X_test.indices, X_test.data, columns,
+                             source_idf, np.asarray(optimized.idf, dtype=np.float64))
+    src_pred, src_proba, _ = source.score_csr(X_test.indptr, X_test.indices, X_test.data)
+    opt_pred, opt_proba, _ = optimized.score_csr(*projected)
+    src_acc = float((src_pred == y_test).mean())
+    opt_acc = float((opt_pred == y_test).mean())
+
+    # b) Per-request latency on synthetic texts drawn from the source vocabulary
+    rng = random.Random(42)
+    vocabulary = source.vocabulary()
+    texts = []
+    for _ in range(args.requests):
+        words = rng.sample(vocabulary, rng.randint(3, 15)) + rng.sample(NOISE, rng.randint(0, 2))
+        rng.shuffle(words)
+        texts.append(" ".join(words))
+    src_lat, opt_lat = request_latencies([source, optimized], texts)
+
+    src_size, opt_size = dir_size(source_dir), dir_size(target_dir)
+    rows = [
+        ("features", f"{source.idf.shape[0]}", f"{len(columns)}", ""),
+        ("size on disk", f"{src_size / 1024:.1f} KiB", f"{opt_size / 1024:.1f} KiB",
+         f"{(opt_size - src_size) / src_size:+.1%}"),
+    ]
+    for label, mmap in (("load (mmap)", True), ("load (in memory)", False)):
+        before, after = load_seconds(source_dir, mmap), load_seconds(target_dir, mmap)
+        rows.append((label, f"{before * 1e3:.2f} ms", f"{after * 1e3:.2f} ms", f"{(after - before) / before:+.1%}"))
+    for label, pct in (("latency p50", 50), ("latency p95", 95)):
+        before, after = np.percentile(src_lat, pct), np.percentile(opt_lat, pct)
+        rows.append((label, f"{before:.0f} µs", f"{after:.0f} µs", f"{(after - before) / before:+.1%}"))
+    rows.append(("X_test accuracy", f"{src_acc:.4f}", f"{opt_acc:.4f}", f"{opt_acc - src_acc:+.4f}"))
+
+    print(f"{'':<18}{'source':>14}{'optimized':>14}{'change':>10}")
+    for label, before, after, change in rows:
+        print(f"{label:<18}{before:>14}{after:>14}{change:>10}")
+    print(f"\nSame prediction on {float((src_pred == opt_pred).mean()):.2%} of X_test; "
+          f"largest probability change {float(np.abs(src_proba - opt_proba).max()):.4f}")
+
+    # ───────────────────────────────────────
+    # 4. Optionally make it current
+    # ───────────────────────────────────────
+    if not args.activate:
+        print(f"\nStaged as '{target_dir}' — not current (python -m ml.registry activate {version}, or --activate)")
+        return
+    if opt_acc < src_acc - args.max_accuracy_drop:
+        sys.exit(f"❌ Accuracy dropped more than {args.max_accuracy_drop} — not activated.")
+    activate(args.registry, version)
+    print(f"\n✅ Optimized model {version} is now current in '{args.registry}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,28 @@
 # - CHECK for max text length (kept in sync with API cap)
 # - SMALLINT for labels (space-efficient)
 # - Index on created_at for faster analytics
-# - Optional SHA-256 text hash (useful for dedup/analytics; can be nullable)
+# - SHA-256 text hash used to dedup repeated submissions; unique together with the
+#   labels (on upgraded tables, only for rows written after the upgrade)
+#
+# feedback_stats aggregates submissions per (text_hash, predicted_label, correct_label):
+# the first submission of a combination stores one feedback row, repeats only bump
+# the counter, so the feedback table doesn't grow with duplicates.
+
+import hashlib
 
 from config.db import db
-from sqlalchemy import CheckConstraint, Index
+from sqlalchemy import CheckConstraint, Index, inspect, text as sql_text
 
 MAX_TEXT_CHARS = 1000  # keep in sync with API/front-end caps
+UNIQUE_INDEX = "ux_feedback_text_labels"
+# pg_advisory_xact_lock key serializing upgrade_feedback_schema across workers
+SCHEMA_LOCK_KEY = 7_305_001
+
+
+def compute_text_hash(text: str) -> str:
+    """SHA-256 hex of the (already trimmed + NFC-normalized) feedback text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 
 class Feedback(db.Model):
     __tablename__ = "sentiment_analysis_feedback"
@@ -25,18 +41,99 @@ class Feedback(db.Model):
     # When row was created (Postgres timestamptz if timezone=True)
     created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
 
-    # Optional: anonymized fingerprint for dedup (compute in route; sha256 hex = 64 chars)
-    # text_hash = db.Column(db.String(64), nullable=True, index=True)
+    # Anonymized fingerprint for dedup (computed in the route; sha256 hex = 64 chars).
+    # Nullable so rows written before the column existed stay valid.
+    text_hash = db.Column(db.String(64), nullable=True)
 
     __table_args__ = (
         # Keep labels in 0..3 at the DB level
         CheckConstraint("predicted_label BETWEEN 0 AND 3", name="ck_feedback_pred_label_range"),
         CheckConstraint("correct_label BETWEEN 0 AND 3", name="ck_feedback_corr_label_range"),
         # Cap text length to avoid pathological payloads (matches API cap)
-        CheckConstraint(f"char_length(text) <= {MAX_TEXT_CHARS}", name="ck_feedback_text_len"),
+        # length() counts characters on Postgres and SQLite (char_length is Postgres-only)
+        CheckConstraint(f"length(text) <= {MAX_TEXT_CHARS}", name="ck_feedback_text_len"),
         # Sort/filter speed-up
         Index("ix_feedback_created_at", "created_at"),
+        # One row per (text, predicted, corrected) combination; also serves the dedup lookups
+        Index(UNIQUE_INDEX, "text_hash", "predicted_label", "correct_label", unique=True),
     )
 
     def __repr__(self) -> str:
         return f"<Feedback id={self.id} pred={self.predicted_label} corr={self.correct_label}>"
+
+
+class FeedbackStats(db.Model):
+    __tablename__ = "feedback_stats"
+
+    # One row per distinct (text, predicted, corrected) combination
+    text_hash       = db.Column(db.String(64), primary_key=True)
+    predicted_label = db.Column(db.SmallInteger, primary_key=True)
+    correct_label   = db.Column(db.SmallInteger, primary_key=True)
+
+    # How many times this exact feedback was submitted
+    submissions = db.Column(db.Integer, nullable=False, default=1)
+
+    first_seen = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
+    last_seen  = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("predicted_label BETWEEN 0 AND 3", name="ck_feedback_stats_pred_label_range"),
+        CheckConstraint("correct_label BETWEEN 0 AND 3", name="ck_feedback_stats_corr_label_range"),
+        CheckConstraint("submissions > 0", name="ck_feedback_stats_submissions_positive"),
+    )
+
+    def __repr__(self) -> str:
+        return (f"<FeedbackStats {self.text_hash[:8]} pred={self.predicted_label} "
+                f"corr={self.correct_label} n={self.submissions}>")
+
+
+def upgrade_feedback_schema(engine, chunk_size: int = 1000) -> None:
+    """Add text_hash to a feedback table created before it existed (idempotent).
+
+    db.create_all() creates missing tables but never alters existing ones, so
+    older deployments get the column here, existing rows are hashed, and
+    feedback_stats is seeded from them. History keeps its one row per
+    submission: the unique index is partial and only covers rows written
+    after the upgrade.
+    On Postgres it runs under an advisory lock: workers that start together
+    (GUNICORN_PRELOAD=0) wait for the first one and then find nothing to do.
+    """
+    table = Feedback.__tablename__
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # No statement_timeout here: the backfill, and waiting for it, can take a while
+            conn.execute(sql_text("SET LOCAL statement_timeout = 0"))
+            conn.execute(sql_text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        if "text_hash" in {c["name"] for c in inspect(conn).get_columns(table)}:
+            return
+
+        conn.execute(sql_text(f"ALTER TABLE {table} ADD COLUMN text_hash VARCHAR(64)"))
+
+        # Backfill hashes in chunks (keyset on id keeps memory flat)
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                sql_text(f"SELECT id, text FROM {table} WHERE id > :last ORDER BY id LIMIT :n"),
+                {"last": last_id, "n": chunk_size},
+            ).fetchall()
+            if not rows:
+                break
+            conn.execute(
+                sql_text(f"UPDATE {table} SET text_hash = :h WHERE id = :id"),
+                [{"h": compute_text_hash(r.text), "id": r.id} for r in rows],
+            )
+            last_id = rows[-1].id
+
+        # Seed the aggregate table from history
+        conn.execute(sql_text(
+            "INSERT INTO feedback_stats (text_hash, predicted_label, correct_label, submissions, first_seen, last_seen) "
+            f"SELECT text_hash, predicted_label, correct_label, COUNT(*), MIN(created_at), MAX(created_at) FROM {table} "
+            "GROUP BY text_hash, predicted_label, correct_label"
+        ))
+
+        # Dedup from here on: the index skips the rows just backfilled (ids up to
+        # last_id), so history and its repeated submissions are kept as they are
+        conn.execute(sql_text(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {UNIQUE_INDEX} "
+            f"ON {table} (text_hash, predicted_label, correct_label) WHERE id > {int(last_id)}"
+        ))
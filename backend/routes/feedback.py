@@ -1,9 +1,17 @@
 # /feedback API: validates payload, normalizes text, enforces size limits,
-# and writes to DB with rollback on error. CORS is handled globally in app.py.
+# and hands the row to the background writer (services/feedback_writer.py),
+# answering 202 without waiting on the DB. With FEEDBACK_ASYNC=0 it writes
+# inline with rollback on error. CORS is handled globally in app.py.
+#
+# Responses (clients: only the status tells the two modes apart):
+#   async (default)      202 {"message": "Feedback queued"} — no "id", the row isn't written yet
+#   FEEDBACK_ASYNC=0     201 {"message": "Feedback saved", "id": <feedback row id>}; a repeat of
+#                        the same text + labels returns the id of the row stored the first time
 
 from flask import Blueprint, request, jsonify, current_app
-from models.feedback import Feedback
-from config.db import db
+from models.feedback import compute_text_hash
+from services import metrics
+from services.feedback_writer import write_feedback_rows
 import os
 import unicodedata
 
@@ -47,14 +55,38 @@ def submit_feedback():
     if len(text) > MAX_TEXT_CHARS:
         return jsonify({"error": "Text too long"}), 413
 
-    # 5) Write to DB with rollback on error
+    row = {
+        "text": text,
+        "text_hash": compute_text_hash(text),  # dedup key (see feedback_stats)
+        "predicted_label": pred,
+        "correct_label": corr,
+    }
+
+    # 5) Tables may not exist yet while starting up in the background
+    startup = current_app.config.get("STARTUP")
+    if startup is not None and not startup.ready:
+        resp = jsonify({"error": "Service not ready"})
+        resp.headers["Retry-After"] = "1"
+        return resp, 503
+
+    # 6) Queue for the background writer; 503 if it is backed up
+    writer = current_app.config.get("FEEDBACK_WRITER")
+    if writer is not None:
+        if not writer.submit(row):
+            resp = jsonify({"error": "Feedback queue is full, try again shortly"})
+            resp.headers["Retry-After"] = "1"
+            return resp, 503
+        metrics.FEEDBACK_LABELS.labels(str(pred), str(corr)).inc()
+        return jsonify({"message": "Feedback queued"}), 202
+
+    # 6b) Synchronous mode: write to DB (rolls back on error)
     try:
-        fb = Feedback(text=text, predicted_label=pred, correct_label=corr)
-        db.session.add(fb)
-        db.session.commit()
+        with metrics.FEEDBACK_WRITE_SECONDS.labels("sync").time():
+            ids = write_feedback_rows([row], return_ids=True)
+        metrics.FEEDBACK_ROWS.labels("written").inc()
+        metrics.FEEDBACK_LABELS.labels(str(pred), str(corr)).inc()
         # Return minimal info; avoid echoing user text back
-        return jsonify({"message": "Feedback saved", "id": fb.id}), 201
+        return jsonify({"message": "Feedback saved", "id": ids[(row["text_hash"], pred, corr)]}), 201
     except Exception:
         current_app.logger.exception("Failed to save feedback")
-        db.session.rollback()
         return jsonify({"error": "Could not save feedback"}), 500
@@ -3,10 +3,17 @@
 # --------------------------------------------------
 # /healthz  = Liveness: super fast, no dependencies, OK if process is up
 # /readyz   = Readiness: confirms model + DB are available; safe for cron/monitoring
+#             ("loading" while startup steps still run, plus their timings).
+#             The DB check uses its own connection and is cached for a few seconds
+#             (services/db_pool.py), so probes never wait on the feedback pool.
+# /metrics  = Prometheus scrape target (see services/metrics.py)
 # --------------------------------------------------
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, Response, jsonify, current_app
 
-from config.db import db  # used only in /readyz; cheap SELECT 1
+from config.db import db  # pool stats in /readyz
+from services.db_pool import pool_stats
+from routes.predict import current_engine
+from services import metrics
 
 health_bp = Blueprint("health", __name__)
 
@@ -23,18 +30,38 @@ def healthz():
 
 @health_bp.get("/readyz")
 def readyz():
-    # Verify model/vectorizer presence
-    model = current_app.config.get("MODEL")
-    vectorizer = current_app.config.get("VECTORIZER")
-    if model is None or vectorizer is None:
+    # Startup steps may still be running in the background (BACKGROUND_STARTUP=1)
+    startup = current_app.config.get("STARTUP")
+    if startup is not None and not startup.ready:
+        status = "loading" if startup.state == "loading" else "degraded"
+        return jsonify(status=status, startup=startup.report()), 503
+
+    # Verify the inference engine is loaded
+    engine = current_engine()
+    if engine is None:
         # Not ready to serve predictions
         return jsonify(status="degraded", error="model_not_loaded"), 503
 
-    # Verify DB connectivity with a trivial query
-    try:
-        db.session.execute(db.text("SELECT 1"))
-    except Exception:
-        current_app.logger.exception("DB readiness check failed")
-        return jsonify(status="degraded", error="db_unavailable"), 503
+    # Verify DB connectivity with a trivial query (separate pool, cached result)
+    probe = current_app.config["DB_PROBE"]
+    ok, error = probe.check()
+    if not ok:
+        return jsonify(status="degraded", error=error), 503
+
+    body = {
+        "status": "ready",
+        "model_version": engine.version,
+        "db": {"probe_age_s": round(probe.age, 1), "pool": pool_stats(db.engine)},
+    }
+    if startup is not None:
+        body["startup"] = startup.report()
+    cache = current_app.config.get("PREDICTION_CACHE")
+    if cache is not None:
+        body["cache"] = cache.stats()  # hit/miss/eviction counters for this worker
+    return jsonify(body), 200
 
-    return jsonify(status="ready"), 200
+@health_bp.get("/metrics")
+def metrics_endpoint():
+    # Aggregated across workers when PROMETHEUS_MULTIPROC_DIR is set
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
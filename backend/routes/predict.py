@@ -1,53 +1,339 @@
 # /predict API: validates input, normalizes text, enforces size limits,
-# and returns a numeric prediction. Errors are user-friendly; details go to logs.
+# applies the training-time text cleaning, and returns a numeric prediction.
+# Errors are user-friendly; details go to logs.
+# /predict/batch scores many texts with one engine call; bad items
+# get their own error entry instead of failing the whole request.
+# Each stage is timed into sentiment_stage_seconds (see services/metrics.py).
+# Responses carry the model_version that produced them; the engine is read
+# once per request, so a hot-swap never mixes two models in one response.
+# The validation/parsing/scoring helpers are shared with the ASGI path (asgi.py).
+# Optional extras: "proba" adds class probabilities, "explain": k adds the k tokens
+# that weighed most (coef * tfidf) — JSON fields on /predict, query args on both.
+# Fast paths: texts that are empty after cleaning or contain no known term get the model's precomputed
+# intercept-only result; identical /predict requests running at the same time in a
+# worker are computed once (services/singleflight.py), as are duplicates in one batch.
 
 from flask import Blueprint, request, jsonify, current_app
+import json
 import os
 import unicodedata
-from typing import Optional
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ml.cache import cache_key
+from ml.preprocess import clean_many, clean_text
+from services import metrics
+from services.metrics import stage
+from services.singleflight import SingleFlight
 
 predict_bp = Blueprint("predict", __name__)
+_in_flight = SingleFlight()  # per worker process
 
 # Allow override via env; keep in sync with frontend <textarea maxLength>
 MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", "1000"))
 
+# Batch limits: item count and raw body size (the app-wide cap is 64KB)
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "1000"))
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(2 * 1024 * 1024)))
+
+NDJSON_MIMETYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+# Most tokens an explanation can list (also what gets computed and cached)
+MAX_EXPLAIN_TOKENS = int(os.getenv("MAX_EXPLAIN_TOKENS", "20"))
+TRUE_VALUES = {True, 1, "1", "true", "yes"}
+
+
+def validate_text(text) -> Tuple[Optional[str], Optional[str], int]:
+    """Return (normalized_text, error_message, http_status) for one input."""
+    if not isinstance(text, str):
+        return None, "Missing or invalid 'text' field", 400
+
+    text = text.strip()
+    if not text:
+        return None, "Text is empty after trimming", 400
+
+    # Enforce length limit (prevents huge payloads). Checked before normalizing:
+    # NFC leaves ASCII as is and can't shrink other text more than a few-fold
+    ascii_only = text.isascii()
+    if len(text) > (MAX_TEXT_CHARS if ascii_only else 4 * MAX_TEXT_CHARS):
+        return None, "Text too long", 413  # Payload Too Large
+
+    # Normalize Unicode (Portuguese accents, composed form)
+    if not ascii_only:
+        text = unicodedata.normalize("NFC", text)
+        if len(text) > MAX_TEXT_CHARS:
+            return None, "Text too long", 413
+
+    return text, None, 200
+
+
+def current_engine():
+    """The engine serving this request (None until a model is loaded)."""
+    holder = current_app.config.get("MODEL_HOLDER")
+    return holder.get() if holder is not None else None
+
+
+def parse_options(*sources) -> Tuple[bool, int, Optional[str]]:
+    """(proba, explain_k, error) from request dicts/args; earlier sources win."""
+    proba, explain = False, 0
+    for source in reversed(sources):
+        if not hasattr(source, "get"):
+            continue
+        if source.get("proba") is not None:
+            value = source.get("proba")
+            proba = (value.lower() if isinstance(value, str) else value) in TRUE_VALUES
+        if source.get("explain") is not None:
+            try:
+                explain = int(source.get("explain"))
+            except (TypeError, ValueError):
+                return False, 0, "'explain' must be an integer"
+    if not 0 <= explain <= MAX_EXPLAIN_TOKENS:
+        return False, 0, f"'explain' must be between 0 and {MAX_EXPLAIN_TOKENS}"
+    return proba, explain, None
+
+
+def shape_result(result, proba: bool, explain: int) -> dict:
+    """Public view of a (possibly cached) full result: only the extras that were asked for."""
+    shaped = {"prediction": result["prediction"]}
+    if proba:
+        shaped["probabilities"] = result["probabilities"]
+    if explain:
+        shaped["explanation"] = result["explanation"][:explain]
+    return shaped
+
+
+def _result(engine, pred, proba_row, explanation=None) -> dict:
+    result = {
+        "prediction": int(pred),
+        "probabilities": {str(c): round(p, 6) for c, p in zip(engine.classes.tolist(), proba_row.tolist())},
+    }
+    if explanation is not None:
+        result["explanation"] = [{"token": token, "weight": round(weight, 6)} for token, weight in explanation]
+    return result
+
+
+_default_results = {}  # model version -> result for a text without any known term
+
+
+def default_result(engine) -> dict:
+    """The intercept-only result (no features), computed once per model version."""
+    result = _default_results.get(engine.version)
+    if result is None:
+        empty = (np.zeros(2, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0))
+        preds, probas, _ = engine.score_csr(*empty)
+        result = _result(engine, preds[0], probas[0], explanation=[])
+        _default_results.clear()  # only the serving version is worth keeping
+        _default_results[engine.version] = result
+    return result
+
+
+def predict_cleaned(engine, cache, cleaned_texts, endpoint, explain: bool = False):
+    """Full result dicts for cleaned texts; cache hits skip the engine entirely.
+
+    Results always carry probabilities (free from the scores); explanations
+    (top MAX_EXPLAIN_TOKENS) only when `explain` is set. A cached entry without
+    an explanation counts as a miss for explain requests and gets upgraded.
+    Empty texts and texts without a known term get default_result(); identical
+    texts are scored once.
+    """
+    results = [None] * len(cleaned_texts)
+    keys = [None] * len(cleaned_texts)
+
+    # Nothing left after cleaning: no cache lookup, no tokenizing
+    empty = [i for i, cleaned in enumerate(cleaned_texts) if not cleaned]
+    if empty:
+        metrics.FAST_PATH.labels("empty_after_cleaning").inc(len(empty))
+        for i in empty:
+            results[i] = default_result(engine)
+
+    if cache is not None:
+        with stage(endpoint, "cache"):
+            for i, cleaned in enumerate(cleaned_texts):
+                if results[i] is not None:
+                    continue
+                keys[i] = cache_key(cleaned)
+                hit = cache.get(keys[i], engine.version)
+                if hit is not None and (not explain or "explanation" in hit):
+                    results[i] = hit
+
+    # One engine call for every miss
+    missing = [i for i, result in enumerate(results) if result is None]
+    if cache is not None:
+        metrics.CACHE_LOOKUPS.labels("hit").inc(len(cleaned_texts) - len(empty) - len(missing))
+        metrics.CACHE_LOOKUPS.labels("miss").inc(len(missing))
+    if missing:
+        # Duplicates in one call (e.g. a micro-batch of identical requests) are scored once
+        unique = {}
+        slot = [unique.setdefault(cleaned_texts[i], len(unique)) for i in missing]
+        if len(unique) < len(missing):
+            metrics.COALESCED.labels("in_batch").inc(len(missing) - len(unique))
+
+        with stage(endpoint, "transform"):
+            indptr, indices, data = engine.transform(list(unique))
+        counts = np.diff(indptr)
+        known = counts > 0
+        scored = [None] * len(unique)
+        if not known.all():
+            metrics.FAST_PATH.labels("no_known_terms").inc(int((~known).sum()))
+            for u in np.flatnonzero(~known).tolist():
+                scored[u] = default_result(engine)
+        if known.any():
+            # Score only rows with features; indices/data already hold nothing else
+            known_indptr = np.zeros(int(known.sum()) + 1, dtype=np.int64)
+            np.cumsum(counts[known], out=known_indptr[1:])
+            with stage(endpoint, "predict"):
+                preds, probas, explanations = engine.score_csr(
+                    known_indptr, indices, data, top_k=MAX_EXPLAIN_TOKENS if explain else 0)
+            for n, u in enumerate(np.flatnonzero(known).tolist()):
+                scored[u] = _result(engine, preds[n], probas[n],
+                                    explanations[n] if explanations is not None else None)
+
+        for i, u in zip(missing, slot):
+            results[i] = scored[u]
+        if cache is not None:
+            for i, u in zip(missing, slot):
+                cache.put(keys[i], engine.version, scored[u])
+
+    for result in results:
+        metrics.PREDICTIONS.labels(str(result["prediction"])).inc()
+    return results
+
+
 @predict_bp.route("/predict", methods=["POST"])
 def predict():
-    # 1) Require JSON body
+    # 1) Require JSON body (size is capped by MAX_CONTENT_LENGTH; the text's own
+    #    length is only known after parsing: escapes and stripped whitespace vary)
     if not request.is_json:
         return jsonify({"error": "Expected application/json body"}), 400
 
     # 2) Parse JSON safely
-    data = request.get_json(silent=True) or {}
-    text = data.get("text")
-
-    # 3) Validate presence and type
-    if not isinstance(text, str):
-        return jsonify({"error": "Missing or invalid 'text' field"}), 400
+    with stage("/predict", "parse"):
+        data = request.get_json(silent=True) or {}
 
-    # 4) Trim and normalize Unicode (Portuguese accents, composed form)
-    text = unicodedata.normalize("NFC", text.strip())
+    # 3) Validate presence/type, trim + normalize, enforce length, extras
+    with stage("/predict", "normalize"):
+        text, error, status = validate_text(data.get("text") if isinstance(data, dict) else None)
+    if error:
+        return jsonify({"error": error}), status
+    proba, explain, error = parse_options(data, request.args)
+    if error:
+        return jsonify({"error": error}), 400
 
-    if not text:
-        return jsonify({"error": "Text is empty after trimming"}), 400
-
-    # 5) Enforce length limit (prevents huge payloads)
-    if len(text) > MAX_TEXT_CHARS:
-        return jsonify({"error": "Text too long"}), 413  # Payload Too Large
-
-    # 6) Ensure model artifacts exist
-    vectorizer = current_app.config.get("VECTORIZER")
-    model = current_app.config.get("MODEL")
-    if vectorizer is None or model is None:
-        current_app.logger.error("Model or vectorizer not loaded")
+    # 4) Ensure model artifacts exist
+    engine = current_engine()
+    if engine is None:
+        current_app.logger.error("Inference engine not loaded")
         return jsonify({"error": "Service not ready"}), 503
 
-    # 7) Predict with guarded error handling
+    # 5) Clean like the training pipeline did, then predict (or hit the cache)
+    #    with guarded error handling; identical requests in flight share one result
     try:
-        X = vectorizer.transform([text])
-        pred = model.predict(X)[0]
-        return jsonify({"prediction": int(pred)})
+        with stage("/predict", "clean"):
+            cleaned = clean_text(text)
+        cache = current_app.config.get("PREDICTION_CACHE")
+        result, shared = _in_flight.do(
+            (engine.version, cleaned, explain > 0),
+            lambda: predict_cleaned(engine, cache, [cleaned], "/predict", explain=explain > 0)[0],
+        )
+        if shared:
+            metrics.COALESCED.labels("in_flight").inc()
+            metrics.PREDICTIONS.labels(str(result["prediction"])).inc()
+        with stage("/predict", "serialize"):
+            return jsonify({**shape_result(result, proba, explain), "model_version": engine.version})
     except Exception as exc:
         # Log stack trace server-side, but keep message generic to clients
         current_app.logger.exception("Prediction failed")
         return jsonify({"error": "Internal error"}), 500
+
+
+def parse_batch_body(body: bytes, mimetype: str, is_json: bool):
+    """Parse the batch body into a list of raw items, or return (None, error, status).
+
+    Accepts a JSON array, a JSON object {"texts": [...]}, or NDJSON (one JSON
+    string or {"text": ...} object per line). Size/count limits are checked too.
+    """
+    if mimetype in NDJSON_MIMETYPES:
+        items = []
+        for line in body.decode("utf-8", errors="replace").splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                # Keep the slot so result indexes still line up with input lines
+                items.append(None)
+    elif not is_json:
+        return None, "Expected application/json or application/x-ndjson body", 400
+    else:
+        try:
+            items = json.loads(body)
+        except ValueError:
+            items = None
+        if isinstance(items, dict):
+            items = items.get("texts")
+        if not isinstance(items, list):
+            return None, "Expected a JSON array of texts or {\"texts\": [...]}", 400
+
+    if not items:
+        return None, "Batch is empty", 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return None, f"Too many items (max {MAX_BATCH_ITEMS})", 413
+    return items, None, 200
+
+
+def validate_batch(items):
+    """Validate each item on its own: (results with error slots filled, valid indexes, valid texts)."""
+    results = [None] * len(items)
+    valid_idx, valid_texts = [], []
+    for i, item in enumerate(items):
+        raw = item.get("text") if isinstance(item, dict) else item
+        text, error, status = validate_text(raw)
+        if error:
+            results[i] = {"error": error, "status": status}
+        else:
+            valid_idx.append(i)
+            valid_texts.append(text)
+    return results, valid_idx, valid_texts
+
+
+@predict_bp.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    # 1) Allow a bigger body than single predictions (per-request override)
+    request.max_content_length = MAX_BATCH_BYTES
+
+    # 2) Parse the batch container
+    with stage("/predict/batch", "parse"):
+        items, error, status = parse_batch_body(request.get_data(), request.mimetype, request.is_json)
+    if error:
+        return jsonify({"error": error}), status
+    proba, explain, error = parse_options(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # 3) Ensure model artifacts exist
+    engine = current_engine()
+    if engine is None:
+        current_app.logger.error("Inference engine not loaded")
+        return jsonify({"error": "Service not ready"}), 503
+
+    # 4) Validate each item independently; collect the good ones for scoring
+    with stage("/predict/batch", "normalize"):
+        results, valid_idx, valid_texts = validate_batch(items)
+
+    # 5) Clean, then one sparse transform + one scoring pass over every
+    #    valid item the cache couldn't answer
+    if valid_texts:
+        try:
+            with stage("/predict/batch", "clean"):
+                cleaned = clean_many(valid_texts)
+            cache = current_app.config.get("PREDICTION_CACHE")
+            scored = predict_cleaned(engine, cache, cleaned, "/predict/batch", explain=explain > 0)
+        except Exception:
+            current_app.logger.exception("Batch prediction failed")
+            return jsonify({"error": "Internal error"}), 500
+        for i, result in zip(valid_idx, scored):
+            results[i] = shape_result(result, proba, explain)
+
+    with stage("/predict/batch", "serialize"):
+        return jsonify({"results": results, "model_version": engine.version})
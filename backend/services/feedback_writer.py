@@ -0,0 +1,226 @@
+# Background feedback writer: /feedback enqueues rows and returns right away;
+# a daemon thread drains the queue and writes them in batches.
+# - Flushes every FEEDBACK_BATCH_SIZE rows or FEEDBACK_FLUSH_MS milliseconds,
+#   whichever comes first, in one transaction (multi-row INSERT + counter upsert)
+# - Duplicate submissions are coalesced into feedback_stats counters instead of
+#   new feedback rows (see models/feedback.py); the insert is ON CONFLICT DO NOTHING,
+#   so the unique (text_hash, labels) index stops concurrent flushes duplicating rows
+# - Bounded queue: when it's full, submit() returns False and the route answers 503
+# - stop() (registered with atexit) drains whatever is left on graceful shutdown
+# - The thread starts lazily in the process that uses it, so it is fork-safe
+#   (e.g. Gunicorn --preload imports the app in the master before forking)
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config.db import db
+from models.feedback import Feedback, FeedbackStats
+from services import metrics
+
+log = logging.getLogger(__name__)
+
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+_STATS_KEY = (FeedbackStats.text_hash, FeedbackStats.predicted_label, FeedbackStats.correct_label)
+
+
+def write_feedback_rows(rows: List[dict], return_ids: bool = False) -> Optional[Dict[Tuple[str, int, int], int]]:
+    """Persist feedback rows with write-time dedup (needs an app context).
+
+    Rows are coalesced by (text_hash, predicted_label, correct_label). Every
+    combination is upserted into feedback_stats with its count; only
+    combinations not seen before get a row in the feedback table. All in one
+    transaction. With return_ids, returns the feedback row id of each
+    combination (the existing row's for repeats).
+    """
+    counts: Dict[Tuple[str, int, int], int] = {}
+    first_row: Dict[Tuple[str, int, int], dict] = {}
+    for row in rows:
+        key = (row["text_hash"], row["predicted_label"], row["correct_label"])
+        counts[key] = counts.get(key, 0) + 1
+        first_row.setdefault(key, row)
+
+    try:
+        session = db.session
+        dialect = session.get_bind().dialect.name
+        upsert = _UPSERT_INSERTS.get(dialect)
+
+        # Which combinations are already known? (one indexed lookup per batch; it also
+        # covers history that predates the unique index, see upgrade_feedback_schema)
+        hashes = {key[0] for key in counts}
+        known = {
+            tuple(r) for r in session.execute(
+                select(*_STATS_KEY).where(FeedbackStats.text_hash.in_(hashes))
+            )
+        }
+
+        # New combinations -> one feedback row each (executemany = multi-row INSERT).
+        # A concurrent writer may have stored one since the lookup: on Postgres/SQLite
+        # the unique index makes that a no-op (no conflict target, so the partial index
+        # of upgraded tables counts too); elsewhere the INSERT fails and the batch is retried
+        new_rows = [first_row[key] for key in counts if key not in known]
+        if new_rows:
+            stmt = upsert(Feedback).on_conflict_do_nothing() if upsert is not None else insert(Feedback)
+            session.execute(stmt, new_rows)
+
+        # Counter upsert; ON CONFLICT keeps counts right if another worker raced us
+        stats_rows = [
+            {"text_hash": h, "predicted_label": p, "correct_label": c, "submissions": n}
+            for (h, p, c), n in counts.items()
+        ]
+        if upsert is not None:
+            stmt = upsert(FeedbackStats)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[col.name for col in _STATS_KEY],
+                set_={
+                    "submissions": FeedbackStats.submissions + stmt.excluded.submissions,
+                    "last_seen": func.now(),
+                },
+            )
+            session.execute(stmt, stats_rows)
+        else:
+            # Portable fallback for other databases: update known keys, insert the rest
+            for row in stats_rows:
+                key = (row["text_hash"], row["predicted_label"], row["correct_label"])
+                if key in known:
+                    session.execute(
+                        FeedbackStats.__table__.update()
+                        .where(tuple_(*_STATS_KEY) == key)
+                        .values(submissions=FeedbackStats.submissions + row["submissions"],
+                                last_seen=func.now())
+                    )
+                else:
+                    session.execute(insert(FeedbackStats), [row])
+
+        ids = None
+        if return_ids:
+            ids = {
+                (h, p, c): row_id for row_id, h, p, c in session.execute(
+                    select(Feedback.id, Feedback.text_hash, Feedback.predicted_label, Feedback.correct_label)
+                    .where(Feedback.text_hash.in_(hashes))
+                    .order_by(Feedback.id.desc())  # oldest row wins if there are several
+                )
+            }
+        session.commit()
+        return ids
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+class FeedbackWriter:
+    def __init__(self, app, max_queue: int = 10000, batch_size: int = 200,
+                 flush_ms: int = 250, max_retries: int = 2):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000.0
+        self.max_retries = max_retries
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+        self.written = self.dropped = self.rejected = 0
+        atexit.register(self.stop)
+
+    @classmethod
+    def from_env(cls, app) -> "FeedbackWriter":
+        return cls(
+            app,
+            max_queue=int(os.getenv("FEEDBACK_QUEUE_SIZE", "10000")),
+            batch_size=int(os.getenv("FEEDBACK_BATCH_SIZE", "200")),
+            flush_ms=int(os.getenv("FEEDBACK_FLUSH_MS", "250")),
+        )
+
+    # ───────────────────────────────────────
+    # Producer side (request threads)
+    # ───────────────────────────────────────
+    def submit(self, row: dict) -> bool:
+        """Queue one row; returns False if the queue is full (apply backpressure)."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.rejected += 1
+            metrics.FEEDBACK_ROWS.labels("rejected").inc()
+            return False
+
+    def _ensure_started(self) -> None:
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None:
+                # New process (or first use): threads don't survive fork, so start one here
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush everything still queued and stop the thread."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        # Anything the thread didn't get to (e.g. it died) is written here
+        while self._drain_once(wait=False):
+            pass
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    # ───────────────────────────────────────
+    # Consumer side (writer thread)
+    # ───────────────────────────────────────
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._drain_once(wait=True)
+        while self._drain_once(wait=False):
+            pass
+
+    def _drain_once(self, wait: bool) -> bool:
+        """Collect one batch (up to batch_size rows or the flush interval) and write it."""
+        try:
+            # Block briefly for the first row so stop() is noticed promptly
+            first = self._queue.get(timeout=0.5) if wait else self._queue.get_nowait()
+        except queue.Empty:
+            return False
+
+        batch: List[dict] = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if wait and timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._flush(batch)
+        return True
+
+    def _flush(self, batch: List[dict]) -> None:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                with self.app.app_context(), metrics.FEEDBACK_WRITE_SECONDS.labels("async").time():
+                    write_feedback_rows(batch)
+                self.written += len(batch)
+                metrics.FEEDBACK_ROWS.labels("written").inc(len(batch))
+                return
+            except Exception:
+                log.exception("Feedback batch write failed (attempt %d/%d, %d rows)",
+                              attempt, self.max_retries, len(batch))
+                if attempt < self.max_retries:
+                    time.sleep(min(0.5 * attempt, 2.0))
+        self.dropped += len(batch)
+        metrics.FEEDBACK_ROWS.labels("dropped").inc(len(batch))
+        log.error("Dropped %d feedback rows after %d failed attempts", len(batch), self.max_retries)
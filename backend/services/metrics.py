@@ -0,0 +1,133 @@
+# Prometheus metrics for the API, exposed on /metrics (routes/health.py).
+# - Per-stage latency histograms for /predict and /predict/batch (parse, normalize,
+#   clean, cache, transform, predict, serialize) and for feedback DB writes
+# - Counters for request sizes, responses by status, predicted labels, feedback
+#   labels and prediction cache hits
+# - Fast-path answers (texts with nothing left after cleaning or no known terms) and
+#   coalesced duplicate predictions
+# - DB pool checkout wait, connections in use vs. capacity (saturation =
+#   in_use / capacity) and checkout timeouts, per pool (services/db_pool.py)
+#
+# Under Gunicorn every worker keeps its own numbers. Set PROMETHEUS_MULTIPROC_DIR
+# (an empty, writable directory) in the environment before the server starts:
+# prometheus_client then keeps values in mmap'd files there and /metrics sums them
+# across workers. gunicorn.conf.py clears the directory on start and cleans up
+# after workers that exit.
+
+import os
+import time
+
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Stage timings are mostly sub-millisecond, so start buckets at 50µs
+STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 2097152)
+
+# ───────────────────────────────────────
+# Metric definitions
+# ───────────────────────────────────────
+REQUEST_SECONDS = Histogram(
+    "sentiment_request_seconds", "Whole-request latency", ["endpoint"], buckets=STAGE_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "sentiment_stage_seconds", "Latency of one stage inside a prediction request",
+    ["endpoint", "stage"], buckets=STAGE_BUCKETS,
+)
+REQUEST_BYTES = Histogram(
+    "sentiment_request_bytes", "Request body size", ["endpoint"], buckets=SIZE_BUCKETS,
+)
+RESPONSES = Counter(
+    "sentiment_responses_total", "Responses by endpoint and HTTP status", ["endpoint", "status"],
+)
+PREDICTIONS = Counter(
+    "sentiment_predictions_total", "Predicted labels", ["label"],
+)
+CACHE_LOOKUPS = Counter(
+    "sentiment_prediction_cache_total", "Prediction cache lookups", ["result"],
+)
+FAST_PATH = Counter(
+    "sentiment_fast_path_total", "Requests/texts answered without parsing or scoring", ["reason"],
+)
+COALESCED = Counter(
+    "sentiment_coalesced_predictions_total",
+    "Predictions served from an identical one computed at the same time", ["mode"],
+)
+MICROBATCH_SIZE = Histogram(
+    "sentiment_microbatch_texts", "Texts scored per micro-batch (ASGI path)",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024),
+)
+FEEDBACK_LABELS = Counter(
+    "sentiment_feedback_total", "Accepted feedback by label pair", ["predicted_label", "correct_label"],
+)
+FEEDBACK_WRITE_SECONDS = Histogram(
+    "sentiment_feedback_write_seconds", "Feedback DB transaction (insert + upsert + commit)",
+    ["mode"], buckets=STAGE_BUCKETS,
+)
+FEEDBACK_ROWS = Counter(
+    "sentiment_feedback_rows_total", "Feedback rows by write outcome", ["outcome"],
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "sentiment_db_pool_checkout_seconds", "Time to get a pooled DB connection (waiting + connecting)",
+    ["pool"], buckets=STAGE_BUCKETS,
+)
+DB_POOL_IN_USE = Gauge(
+    "sentiment_db_pool_connections_in_use", "DB connections checked out of the pool",
+    ["pool"], multiprocess_mode="livesum",
+)
+DB_POOL_CAPACITY = Gauge(
+    "sentiment_db_pool_capacity", "pool_size + max_overflow", ["pool"], multiprocess_mode="livesum",
+)
+DB_POOL_TIMEOUTS = Counter(
+    "sentiment_db_pool_timeouts_total", "Checkouts that gave up waiting for a free connection", ["pool"],
+)
+
+
+def stage(endpoint: str, name: str):
+    """Context manager timing one stage: `with stage("predict", "clean"): ...`"""
+    return STAGE_SECONDS.labels(endpoint, name).time()
+
+
+# ───────────────────────────────────────
+# Flask wiring
+# ───────────────────────────────────────
+def init_app(app) -> None:
+    """Time every request and count responses (endpoint = URL rule, never raw path)."""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record(resp):
+        start = g.pop("metrics_start", None)
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        if start is not None:
+            REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
+        if request.content_length:
+            REQUEST_BYTES.labels(endpoint).observe(request.content_length)
+        RESPONSES.labels(endpoint, str(resp.status_code)).inc()
+        return resp
+
+
+def render():
+    """(body, content_type) in the Prometheus text exposition format."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
@@ -0,0 +1,51 @@
+# Request coalescing within one worker process: when several threads ask for the same
+# key at once (a viral tweet pasted by many users, a client retrying), only the first
+# computes the result; the others wait for it and get the same object back.
+# Nothing is kept once the call finishes — repeated work over time is the prediction
+# cache's job (ml/cache.py); this only covers requests that overlap.
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(result, shared): run fn() unless an identical call is in flight, then wait for it.
+
+        An exception raised by the running call is raised in every waiting caller too.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
@@ -0,0 +1,70 @@
+# Startup steps (DB schema, model load) with per-step timings.
+# - Inline by default: importing app.py returns a fully loaded app
+#   (what Gunicorn --preload, scripts and the benchmarks want)
+# - BACKGROUND_STARTUP=1 runs the steps in a thread, so the server starts
+#   listening and /healthz answers right away; /readyz says "loading" until done
+# Timings are logged once and included in /readyz.
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+
+class Startup:
+    def __init__(self, started_at: float):
+        self.started_at = started_at  # time.perf_counter() taken at the top of app.py
+        self.timings = {}             # step name -> seconds
+        self.error: Optional[str] = None
+        self._done = threading.Event()
+
+    @classmethod
+    def background_from_env(cls) -> bool:
+        return os.getenv("BACKGROUND_STARTUP", "0") == "1"
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def state(self) -> str:
+        if self.error is not None:
+            return "failed"
+        return "ready" if self.ready else "loading"
+
+    def run(self, steps: List[Tuple[str, Callable[[], None]]], background: bool = False) -> None:
+        self.timings["import"] = time.perf_counter() - self.started_at
+        if background:
+            threading.Thread(target=self._run, args=(steps,), name="startup", daemon=True).start()
+        else:
+            self._run(steps, reraise=True)
+
+    def _run(self, steps, reraise: bool = False) -> None:
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as exc:
+                self.error = f"{name}: {exc}"
+                log.exception("Startup step '%s' failed", name)
+                if reraise:
+                    raise
+                return
+            self.timings[name] = time.perf_counter() - start
+
+        self.timings["total"] = time.perf_counter() - self.started_at
+        self._done.set()
+        log.info("Startup finished in %.0f ms (%s)", self.timings["total"] * 1e3,
+                 ", ".join(f"{k} {v * 1e3:.0f} ms" for k, v in self.timings.items() if k != "total"))
+
+    def report(self) -> dict:
+        body = {
+            "state": self.state,
+            "timings_ms": {name: round(sec * 1e3, 1) for name, sec in self.timings.items()},
+        }
+        if self.error is not None:
+            body["error"] = self.error
+        return body
@@ -0,0 +1,35 @@
+# Shared fixtures: the Flask app against a throwaway SQLite DB and the committed model.
+# Run from backend/:  python -m pytest -q
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+_tmp_dir = tempfile.mkdtemp(prefix="sentiment-tests-")
+os.environ["DATABASE_URL"] = ""
+os.environ["MODEL_POLL_SECONDS"] = "0"
+os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")
+os.chdir(BACKEND_DIR)
+
+import config.db  # noqa: E402
+
+# Must happen before importing app, which reads the URL (see bench/bench.py)
+config.db.DATABASE_URL = f"sqlite:///{Path(_tmp_dir) / 'test.db'}"
+
+
+@pytest.fixture(scope="session")
+def app():
+    import app as app_module
+
+    return app_module.app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,29 @@
+from ml.cache import PredictionCache, SQLiteCacheStore
+
+
+def test_versions_share_the_cache_without_evicting_each_other(tmp_path):
+    shared = SQLiteCacheStore(str(tmp_path / "cache.db"), max_entries=100, ttl_seconds=60)
+    cache = PredictionCache(max_entries=100, ttl_seconds=60, shared=shared)
+
+    cache.put("k", "v1", {"prediction": 0})
+    cache.put("k", "v2", {"prediction": 1})  # a worker already on the new model
+
+    assert cache.get("k", "v1") == {"prediction": 0}
+    assert cache.get("k", "v2") == {"prediction": 1}
+    assert cache.get("k", "v3") is None
+
+    # Another worker (no local entries) still finds both versions in the shared store
+    other = PredictionCache(max_entries=100, ttl_seconds=60, shared=shared)
+    assert other.get("k", "v1") == {"prediction": 0}
+    assert other.get("k", "v2") == {"prediction": 1}
+
+
+def test_shared_prune_keeps_current_entries_of_every_version(tmp_path):
+    shared = SQLiteCacheStore(str(tmp_path / "cache.db"), max_entries=100, ttl_seconds=60)
+    shared.put("a", "v1", {"prediction": 0})
+    shared.put("b", "v2", {"prediction": 1})
+
+    shared.prune()
+
+    assert shared.get("a", "v1") == {"prediction": 0}
+    assert shared.get("b", "v2") == {"prediction": 1}
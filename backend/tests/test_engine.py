@@ -0,0 +1,45 @@
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from ml.artifacts import load_engine
+from ml.datasets import DATASET_DIR, load_dataset
+from ml.engine import LinearTextEngine
+from ml.registry import REGISTRY_DIR, current_dir
+
+TEXTS = ["bom demais", "muito bom", "ruim demais", "muito ruim", "normal hoje", "hoje normal"]
+LABELS = [0, 0, 1, 1, 2, 2]
+
+
+def test_registry_artifact_predicts_like_the_pickled_model():
+    # The committed artifact against the pickles it was compiled from (05_export_engine.py)
+    with open("data/tfidf_vectorizer.pkl", "rb") as f:
+        vectorizer = pickle.load(f)
+    with open("data/sentiment_model.pkl", "rb") as f:
+        model = pickle.load(f)
+    engine = load_engine(current_dir(REGISTRY_DIR), verify=True)
+    X_test = load_dataset(f"{DATASET_DIR}/test").matrix()
+
+    engine_pred = engine.predict_csr(X_test.indptr, X_test.indices, X_test.data)
+    assert int((engine_pred != model.predict(X_test)).sum()) == 0
+    assert list(engine.vocabulary()) == sorted(vectorizer.vocabulary_)
+
+
+@pytest.mark.parametrize("solver", ["lbfgs", "saga"])
+def test_multinomial_models_compile(solver):
+    vectorizer = TfidfVectorizer().fit(TEXTS)
+    model = LogisticRegression(solver=solver, max_iter=1000).fit(vectorizer.transform(TEXTS), LABELS)
+    engine = LinearTextEngine.from_sklearn(vectorizer, model)
+    X = vectorizer.transform(TEXTS)
+    assert list(engine.predict(TEXTS)) == list(model.predict(X))
+    np.testing.assert_allclose(engine.predict_proba_csr(*engine.transform(TEXTS)), model.predict_proba(X), atol=1e-9)
+
+
+def test_one_vs_rest_multiclass_is_rejected():
+    vectorizer = TfidfVectorizer().fit(TEXTS)
+    model = LogisticRegression(solver="liblinear").fit(vectorizer.transform(TEXTS), LABELS)
+    with pytest.raises(ValueError, match="one-vs-rest"):
+        LinearTextEngine.from_sklearn(vectorizer, model)
@@ -0,0 +1,52 @@
+import time
+import uuid
+
+from config.db import db
+from models.feedback import Feedback, FeedbackStats
+
+
+def feedback_payload(text=None):
+    return {"text": text or f"Feedback de teste {uuid.uuid4().hex}", "predicted_label": 0, "correct_label": 1}
+
+
+def test_sync_feedback_returns_201_with_the_row_id(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "FEEDBACK_WRITER", None)  # same as FEEDBACK_ASYNC=0
+    payload = feedback_payload()
+
+    resp = client.post("/feedback", json=payload)
+
+    assert resp.status_code == 201
+    body = resp.get_json()
+    assert body["message"] == "Feedback saved"
+    with app.app_context():
+        row = db.session.get(Feedback, body["id"])
+        assert row is not None and row.text == payload["text"]
+
+
+def test_sync_feedback_repeat_returns_the_same_id(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "FEEDBACK_WRITER", None)
+    payload = feedback_payload()
+
+    first = client.post("/feedback", json=payload).get_json()["id"]
+    second = client.post("/feedback", json=payload).get_json()["id"]
+
+    assert first == second
+    with app.app_context():
+        stats = db.session.query(FeedbackStats).filter_by(text_hash=db.session.get(Feedback, first).text_hash).one()
+        assert stats.submissions == 2
+
+
+def test_async_feedback_returns_202_without_id_and_is_written(app, client):
+    assert app.config.get("FEEDBACK_WRITER") is not None
+    payload = feedback_payload()
+
+    resp = client.post("/feedback", json=payload)
+
+    assert resp.status_code == 202
+    assert resp.get_json() == {"message": "Feedback queued"}
+    deadline = time.monotonic() + 5
+    with app.app_context():
+        while db.session.query(Feedback).filter_by(text=payload["text"]).count() == 0:
+            assert time.monotonic() < deadline, "queued feedback was never written"
+            time.sleep(0.05)
+            db.session.rollback()  # fresh snapshot on the next query
@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from models.feedback import UNIQUE_INDEX, compute_text_hash, upgrade_feedback_schema
+
+# The feedback table as the first release created it: no text_hash, one row per submission
+OLD_SCHEMA = """
+CREATE TABLE sentiment_analysis_feedback (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    predicted_label SMALLINT NOT NULL,
+    correct_label SMALLINT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL
+)
+"""
+STATS_SCHEMA = """
+CREATE TABLE feedback_stats (
+    text_hash VARCHAR(64), predicted_label SMALLINT, correct_label SMALLINT,
+    submissions INTEGER NOT NULL, first_seen DATETIME, last_seen DATETIME,
+    PRIMARY KEY (text_hash, predicted_label, correct_label)
+)
+"""
+
+
+def test_upgrade_keeps_history_and_dedups_new_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(OLD_SCHEMA))
+        conn.execute(text(STATS_SCHEMA))
+        conn.execute(
+            text("INSERT INTO sentiment_analysis_feedback (text, predicted_label, correct_label) VALUES (:t, :p, :c)"),
+            [{"t": "bom", "p": 0, "c": 1}, {"t": "bom", "p": 0, "c": 1}, {"t": "bom", "p": 1, "c": 0},
+             {"t": "ruim", "p": 1, "c": 0}],
+        )
+
+    upgrade_feedback_schema(engine)
+    upgrade_feedback_schema(engine)  # idempotent
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT id, text_hash, predicted_label, correct_label FROM sentiment_analysis_feedback ORDER BY id"
+        )).fetchall()
+        stats = dict(conn.execute(text(
+            "SELECT text_hash || ':' || predicted_label || correct_label, submissions FROM feedback_stats"
+        )).fetchall())
+    assert [r.id for r in rows] == [1, 2, 3, 4]  # history is kept, repeats included
+    assert rows[0].text_hash == compute_text_hash("bom")
+    assert stats[f"{compute_text_hash('bom')}:01"] == 2
+    indexes = {ix["name"]: ix for ix in inspect(engine).get_indexes("sentiment_analysis_feedback")}
+    assert indexes[UNIQUE_INDEX]["unique"]
+
+    # Rows written after the upgrade are unique per combination
+    insert = text("INSERT INTO sentiment_analysis_feedback (text, predicted_label, correct_label, text_hash) "
+                  "VALUES ('novo', 0, 1, :h)")
+    with engine.begin() as conn:
+        conn.execute(insert, {"h": compute_text_hash("novo")})
+    with pytest.raises(IntegrityError), engine.begin() as conn:
+        conn.execute(insert, {"h": compute_text_hash("novo")})
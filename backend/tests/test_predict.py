@@ -0,0 +1,47 @@
+import json
+
+
+def post_json(client, path, payload):
+    # json.dumps defaults (ensure_ascii=True): astral characters become \uXXXX surrogate pairs
+    return client.post(path, data=json.dumps(payload), content_type="application/json")
+
+
+def test_predict_accepts_astral_characters_below_the_limit(client):
+    resp = post_json(client, "/predict", {"text": "\U0001F600" * 600})
+    assert resp.status_code == 200
+    assert "prediction" in resp.get_json()
+
+
+def test_predict_ignores_surrounding_whitespace_in_the_limit(client):
+    resp = post_json(client, "/predict", {"text": " " * 5000 + "muito bom" + "\n" * 5000})
+    assert resp.status_code == 200
+
+
+def test_predict_rejects_text_over_the_limit(client):
+    resp = post_json(client, "/predict", {"text": "a" * 1001})
+    assert resp.status_code == 413
+    assert resp.get_json() == {"error": "Text too long"}
+
+
+def test_asgi_batch_reports_the_model_version_when_every_item_is_invalid(app):
+    import asyncio
+
+    import asgi
+
+    messages = [{"type": "http.request", "body": json.dumps({"texts": ["", "   "]}).encode()}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/predict/batch", "query_string": b"",
+             "headers": [(b"content-type", b"application/json")]}
+    asyncio.run(asgi.app(scope, receive, send))
+
+    body = json.loads(sent[1]["body"])
+    assert sent[0]["status"] == 200
+    assert [r["status"] for r in body["results"]] == [400, 400]
+    assert body["model_version"] == asgi.current_engine().version